@@ -0,0 +1,201 @@
+"""Seeded generators for random automatons, grammars and input strings"""
+import itertools
+import random
+import string
+from typing import Dict, List, Optional, Set, Tuple
+from xml.sax.saxutils import escape
+
+from lib.cfg import CFG, Productions
+from lib.dfa import DFA
+from lib.nfa import NFA
+from lib.state import State
+from lib.transition import Transition
+
+
+def random_symbols(num_symbols: int, symbol_length: int = 1,
+                   overlapping: bool = False) -> List[str]:
+    """Creates symbols of the same length, so strings of them can be
+    tokenized in only one way, or overlapping symbols of lengths 1 to
+    symbol_length where shorter symbols are prefixes of longer ones
+    (a, ab, abc, b, bc, ...), so strings of them are split by longest
+    match and NFAs also step on the shorter symbols
+
+    Args:
+        num_symbols (int): The number of symbols
+        symbol_length (int, optional): The number of characters of every symbol,
+            or the largest one if overlapping. Defaults to 1.
+        overlapping (bool, optional): Create overlapping symbols. Defaults to False.
+
+    Returns:
+        List[str]: The symbols
+    """
+    if overlapping:
+        if symbol_length < 2:
+            raise ValueError("Overlapping symbols need a symbol length of at least 2")
+        letters = string.ascii_lowercase
+        symbols = [letters[start:start + length] for start in range(len(letters) - symbol_length + 1)
+                   for length in range(1, symbol_length + 1)][:num_symbols]
+    else:
+        symbols = ["".join(chars) for chars in itertools.islice(
+            itertools.product(string.ascii_lowercase, repeat=symbol_length), num_symbols)]
+    if len(symbols) < num_symbols:
+        raise ValueError(
+            f"There are only {len(symbols)} symbols of length {symbol_length}")
+    return symbols
+
+
+def _random_states(rng: random.Random, num_states: int) -> Set[State]:
+    return {State(i, f"q{i}", i == 0, rng.random() < 0.5) for i in range(num_states)}
+
+
+def random_dfa(num_states: int, num_symbols: int, symbol_length: int = 1,
+               seed: int = 0, overlapping: bool = False) -> DFA:
+    """Creates a random complete DFA
+
+    Args:
+        num_states (int): The number of states
+        num_symbols (int): The size of the alphabet
+        symbol_length (int, optional): The number of characters of every symbol. Defaults to 1.
+        seed (int, optional): The seed. Defaults to 0.
+        overlapping (bool, optional): Use overlapping symbols, see random_symbols. Defaults to False.
+
+    Returns:
+        DFA: The DFA
+    """
+    return DFA(*random_dfa_parts(num_states, num_symbols, symbol_length, seed, overlapping))
+
+
+def random_dfa_parts(num_states: int, num_symbols: int, symbol_length: int = 1,
+                     seed: int = 0, overlapping: bool = False
+                     ) -> Tuple[Set[State], Dict[Transition, List[int]]]:
+    """Creates the states and transitions of a random complete DFA, see random_dfa"""
+    rng = random.Random(seed)
+    symbols = random_symbols(num_symbols, symbol_length, overlapping)
+    transitions = {Transition(i, symbol): [rng.randrange(num_states)]
+                   for i in range(num_states) for symbol in symbols}
+    return _random_states(rng, num_states), transitions
+
+
+def random_nfa(num_states: int, num_symbols: int, num_dests: int = 2,
+               epsilon_density: float = 0.1, symbol_length: int = 1,
+               seed: int = 0, overlapping: bool = False,
+               symbols_per_state: Optional[int] = None) -> NFA:
+    """Creates a random NFA
+
+    Args:
+        num_states (int): The number of states
+        num_symbols (int): The size of the alphabet
+        num_dests (int, optional): The number of destinations of every transition. Defaults to 2.
+        epsilon_density (float, optional): The chance that a state has an epsilon transition
+            to a random state, drawn once per destination. Defaults to 0.1.
+        symbol_length (int, optional): The number of characters of every symbol. Defaults to 1.
+        seed (int, optional): The seed. Defaults to 0.
+        overlapping (bool, optional): Use overlapping symbols, see random_symbols. Defaults to False.
+        symbols_per_state (Optional[int], optional): The number of random symbols every state
+            has transitions on, for sparse automatons. Defaults to all symbols.
+
+    Returns:
+        NFA: The NFA
+    """
+    return NFA(*random_nfa_parts(num_states, num_symbols, num_dests, epsilon_density,
+                                 symbol_length, seed, overlapping, symbols_per_state))
+
+
+def random_nfa_parts(num_states: int, num_symbols: int, num_dests: int = 2,
+                     epsilon_density: float = 0.1, symbol_length: int = 1,
+                     seed: int = 0, overlapping: bool = False,
+                     symbols_per_state: Optional[int] = None
+                     ) -> Tuple[Set[State], Dict[Transition, List[int]]]:
+    """Creates the states and transitions of a random NFA, see random_nfa"""
+    rng = random.Random(seed)
+    symbols = random_symbols(num_symbols, symbol_length, overlapping)
+    transitions = {Transition(i, symbol): rng.sample(range(num_states), min(num_dests, num_states))
+                   for i in range(num_states)
+                   for symbol in (symbols if symbols_per_state is None
+                                  else rng.sample(symbols, symbols_per_state))}
+    for i in range(num_states):
+        dests = [rng.randrange(num_states) for _ in range(num_dests)
+                 if rng.random() < epsilon_density]
+        if dests:
+            transitions[Transition(i, "")] = dests
+    return _random_states(rng, num_states), transitions
+
+
+def random_strings(symbols: List[str], count: int, max_length: int,
+                   seed: int = 0) -> List[str]:
+    """Creates random strings of symbols
+
+    Args:
+        symbols (List[str]): The symbols
+        count (int): The number of strings
+        max_length (int): The largest number of symbols in a string
+        seed (int, optional): The seed. Defaults to 0.
+
+    Returns:
+        List[str]: The strings
+    """
+    rng = random.Random(seed)
+    return ["".join(rng.choices(symbols, k=rng.randint(0, max_length)))
+            for _ in range(count)]
+
+
+def random_cfg(num_variables: int, num_tails: int, max_tail_length: int = 4,
+               num_terminals: int = 3, empty_density: float = 0.1,
+               seed: int = 0) -> CFG:
+    """Creates a random grammar. Variable i only derives variables with a
+    larger index, so unit and empty productions can't chain through the
+    whole grammar, which would make the CNF conversion blow up
+
+    Args:
+        num_variables (int): The number of variables
+        num_tails (int): The number of productions of every variable
+        max_tail_length (int, optional): The largest number of symbols in a tail. Defaults to 4.
+        num_terminals (int, optional): The number of terminals. Defaults to 3.
+        empty_density (float, optional): The chance that a variable has an
+            empty production. Defaults to 0.1.
+        seed (int, optional): The seed. Defaults to 0.
+
+    Returns:
+        CFG: The grammar, with V0 as the start variable
+    """
+    rng = random.Random(seed)
+    productions = Productions()
+    # Build the tails from ids, so a tail like V7 is one variable
+    symbols = productions.writable_symbols()
+    variables = [symbols.add(f"V{i}", variable=True) for i in range(num_variables)]
+    terminals = [symbols.add(terminal) for terminal in random_symbols(num_terminals)]
+    for i, variable in enumerate(variables):
+        later = variables[i + 1:i + 11]
+        for _ in range(num_tails):
+            tail = tuple(rng.choice(later) if later and rng.random() < 0.5 else rng.choice(terminals)
+                         for _ in range(rng.randint(1, max_tail_length)))
+            productions.add_production_ids(variable, tail)
+        if rng.random() < empty_density:
+            productions.add_production_ids(variable, ())
+    return CFG("V0", productions)
+
+
+def write_jflap(states: Set[State], transitions: Dict[Transition, List[int]],
+                path: str) -> None:
+    """Writes an automaton as a JFLAP xml file
+
+    Args:
+        states (Set[State]): The states
+        transitions (Dict[Transition, List[int]]): The transitions
+        path (str): The path of the file
+    """
+    with open(path, "w") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
+                "<structure>\n<type>fa</type>\n<automaton>\n")
+        for state in sorted(states):
+            f.write(f'<state id="{state.id}" name="{escape(state.name)}">'
+                    "<x>0.0</x><y>0.0</y>"
+                    f"{'<initial/>' if state.initial else ''}"
+                    f"{'<final/>' if state.final else ''}</state>\n")
+        for transition, dests in transitions.items():
+            read = (f"<read>{escape(transition.string)}</read>"
+                    if transition.string else "<read/>")
+            for dest in dests:
+                f.write(f"<transition><from>{transition.origin}</from>"
+                        f"<to>{dest}</to>{read}</transition>\n")
+        f.write("</automaton>\n</structure>\n")
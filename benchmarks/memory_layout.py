@@ -0,0 +1,56 @@
+"""Compares the memory used by the old dict based automaton layout
+with the compact array based layout of Automaton.
+
+Run with: python -m benchmarks.memory_layout
+"""
+import gc
+import tracemalloc
+from typing import Callable, Dict, List, Set
+
+from tabulate import tabulate
+
+from benchmarks.generators import random_nfa_parts
+from lib.automaton import Automaton
+from lib.state import State
+from lib.transition import Transition
+
+
+def legacy_layout(states: Set[State], transitions: Dict[Transition, List[int]]):
+    """Builds the dicts the automaton used to store"""
+    by_id = {state.id: state for state in states}
+    return by_id, {transition: {by_id[dest] for dest in dests}
+                   for transition, dests in transitions.items()}
+
+
+def measure(build: Callable[[], object]) -> int:
+    """Returns the number of bytes allocated by build that are still alive"""
+    tracemalloc.start()
+    result = build()
+    # Also clears the free lists, which still count as allocated
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main() -> None:
+    rows = []
+    # states, symbols, destinations, symbol length, symbols per state
+    sizes = [(1000, 2, 1, 1, None), (10000, 4, 2, 1, None), (100000, 4, 1, 1, None),
+             # A large alphabet where every state only uses a few symbols
+             (20000, 500, 1, 2, 3)]
+    for num_states, num_symbols, num_dests, symbol_length, symbols_per_state in sizes:
+        states, transitions = random_nfa_parts(
+            num_states, num_symbols, num_dests, epsilon_density=0, symbol_length=symbol_length,
+            symbols_per_state=symbols_per_state)
+        legacy = measure(lambda: legacy_layout(states, transitions))
+        compact = measure(lambda: Automaton(states, transitions))
+        rows.append([num_states, num_symbols, len(transitions), legacy // 1024,
+                     compact // 1024, f"{legacy / compact:.1f}x"])
+    print(tabulate(rows, headers=["States", "Symbols", "Transitions", "Dict KiB",
+                                  "Compact KiB", "Saving"]))
+
+
+if __name__ == "__main__":
+    main()
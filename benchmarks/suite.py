@@ -0,0 +1,172 @@
+"""Times the main operations on random automatons and grammars of
+different sizes and prints the results as JSON, so runs can be compared.
+
+Run with: python -m benchmarks.suite [--quick] [--repeat N] [--output FILE]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from benchmarks.generators import (random_cfg, random_dfa, random_nfa_parts,
+                                   random_strings, random_symbols, write_jflap)
+from lib.automaton_ops import (bin, convert_to_chomsky,
+                               create_distinguishability_table, dell, term,
+                               unit)
+from lib.nfa import NFA
+from lib.parser import parse_jflap_xml
+
+# The sizes of every benchmark, the quick sizes are for checking that
+# the suite still runs
+SIZES = {
+    "full": {
+        # states, symbols, symbol length, overlapping symbols
+        "dfa": [(100, 2, 1, False), (1000, 4, 1, False), (10000, 4, 2, False),
+                (1000, 6, 3, True)],
+        # states, symbols, epsilon density, symbol length, overlapping symbols
+        "nfa": [(100, 2, 0.1, 1, False), (1000, 4, 0.1, 1, False),
+                (1000, 4, 0.5, 2, False), (1000, 6, 0.1, 3, True)],
+        "distinguishability": [(50, 2), (200, 3), (500, 4)],
+        "jflap": [(1000, 4), (10000, 4)],
+        "cfg": [(50, 4), (200, 4), (1000, 4)],
+    },
+    "quick": {
+        "dfa": [(20, 2, 1, False), (20, 3, 2, True)],
+        "nfa": [(20, 2, 0.2, 1, False), (20, 3, 0.2, 2, True)],
+        "distinguishability": [(20, 2)],
+        "jflap": [(50, 2)],
+        "cfg": [(10, 3)],
+    },
+}
+
+NUM_STRINGS = 1000
+MAX_STRING_LENGTH = 50
+
+
+def measure(func: Callable[[Any], Any], setup: Callable[[], Any] = lambda: None,
+            repeat: int = 5) -> Dict[str, float]:
+    """Times a function, setup is called before every run and is not timed
+
+    Args:
+        func (Callable[[Any], Any]): The function, called with the result of setup
+        setup (Callable[[], Any], optional): Creates the argument of func. Defaults to nothing.
+        repeat (int, optional): The number of runs. Defaults to 5.
+
+    Returns:
+        Dict[str, float]: The fastest, median and mean time in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        argument = setup()
+        start = time.perf_counter()
+        func(argument)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return {"min": times[0], "median": times[len(times) // 2],
+            "mean": sum(times) / len(times)}
+
+
+def _result(benchmark: str, params: Dict[str, Any], timing: Dict[str, float]) -> Dict[str, Any]:
+    return {"benchmark": benchmark, "params": params, **timing}
+
+
+def bench_automatons(sizes: Dict[str, list], repeat: int, seed: int) -> Iterator[Dict[str, Any]]:
+    for num_states, num_symbols, symbol_length, overlapping in sizes["dfa"]:
+        params = {"states": num_states, "symbols": num_symbols, "symbol_length": symbol_length,
+                  "overlapping": overlapping, "strings": NUM_STRINGS}
+        dfa = random_dfa(num_states, num_symbols, symbol_length, seed, overlapping)
+        strings = random_strings(random_symbols(num_symbols, symbol_length, overlapping),
+                                 NUM_STRINGS, MAX_STRING_LENGTH, seed)
+        dfa.compile()
+        yield _result("dfa.check_string_in_language", params, measure(
+            lambda _: [dfa.check_string_in_language(s) for s in strings], repeat=repeat))
+
+    for num_states, num_symbols, epsilon_density, symbol_length, overlapping in sizes["nfa"]:
+        params = {"states": num_states, "symbols": num_symbols, "epsilon_density": epsilon_density,
+                  "symbol_length": symbol_length, "overlapping": overlapping}
+        parts = random_nfa_parts(num_states, num_symbols, 2, epsilon_density,
+                                 symbol_length, seed, overlapping)
+        strings = random_strings(random_symbols(num_symbols, symbol_length, overlapping),
+                                 NUM_STRINGS, MAX_STRING_LENGTH, seed)
+        # A new NFA for every run so the closure cache starts out empty
+        yield _result("nfa.check_string_in_language", {**params, "strings": NUM_STRINGS}, measure(
+            lambda nfa: [nfa.check_string_in_language(s) for s in strings],
+            lambda: NFA(*parts), repeat))
+        yield _result("nfa.calculate_e_closure", params, measure(
+            lambda nfa: [nfa.calculate_e_closure({state_id}) for state_id in nfa.states],
+            lambda: NFA(*parts), repeat))
+
+    for num_states, num_symbols in sizes["distinguishability"]:
+        dfa = random_dfa(num_states, num_symbols, seed=seed)
+        yield _result("create_distinguishability_table",
+                      {"states": num_states, "symbols": num_symbols},
+                      measure(lambda _: create_distinguishability_table(dfa), repeat=repeat))
+
+    with tempfile.TemporaryDirectory() as directory:
+        for num_states, num_symbols in sizes["jflap"]:
+            path = os.path.join(directory, f"{num_states}.jff")
+            write_jflap(*random_nfa_parts(num_states, num_symbols, seed=seed), path)
+            yield _result("parse_jflap_xml",
+                          {"states": num_states, "symbols": num_symbols,
+                           "bytes": os.path.getsize(path)},
+                          measure(lambda _: parse_jflap_xml(path), repeat=repeat))
+
+
+def bench_grammars(sizes: Dict[str, list], repeat: int, seed: int) -> Iterator[Dict[str, Any]]:
+    for num_variables, num_tails in sizes["cfg"]:
+        cfg = random_cfg(num_variables, num_tails, seed=seed)
+        params = {"variables": num_variables, "tails": num_tails}
+        for name, step in [("bin", bin), ("del", dell), ("unit", unit), ("term", term)]:
+            yield _result(f"cnf.{name}", params, measure(
+                lambda _: step(cfg, False), repeat=repeat))
+        yield _result("cnf.convert_to_chomsky", params, measure(
+            lambda _: convert_to_chomsky(cfg), repeat=repeat))
+
+
+def run(quick: bool = False, repeat: int = 5, seed: int = 0) -> Dict[str, Any]:
+    """Runs every benchmark
+
+    Args:
+        quick (bool, optional): Use tiny sizes. Defaults to False.
+        repeat (int, optional): The number of runs of every benchmark. Defaults to 5.
+        seed (int, optional): The seed of the generators. Defaults to 0.
+
+    Returns:
+        Dict[str, Any]: The results and the environment they were measured in
+    """
+    sizes = SIZES["quick" if quick else "full"]
+    results: List[Dict[str, Any]] = []
+    results.extend(bench_automatons(sizes, repeat, seed))
+    results.extend(bench_grammars(sizes, repeat, seed))
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="use tiny sizes")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of every benchmark")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generators")
+    parser.add_argument("--output", help="write the JSON to a file instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = json.dumps(run(args.quick, args.repeat, args.seed), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        sys.stdout.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
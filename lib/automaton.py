@@ -1,43 +1,160 @@
 """Module that contains common logic to automatons"""
-import sys
-from typing import Dict, Iterable, List, Optional, Set
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
 
+from lib import instrumentation
+from lib.runner import Runner
 from lib.state import State
+from lib.tokenizer import SymbolTrie
 from lib.transition import Transition
+from lib.views import StatesView, TransitionsView
 
 
 class Automaton:
-    """Class representing an automaton"""
+    """Class representing an automaton.
+
+    States are stored as contiguous indices into parallel arrays of ids,
+    names and final flags, and transitions in CSR form: the transitions
+    of state i are the edges _offsets[i] to _offsets[i + 1] of the parallel
+    arrays _edge_labels and _targets, sorted by label, with one edge for
+    every destination. The memory is linear in the number of transitions,
+    no matter how large the alphabet is. The states and transitions
+    attributes are read only views on top of that.
+    """
 
     def __init__(self, states: Set[State], transitions: Dict[Transition, List[int]]) -> None:
-        self.initial_state: State
-        self.transitions: Dict[Transition, Set[State]]
-        self.transitions = dict()
-        self.alphabet = set()
-    
-        # We'll convert to a dict here for faster lookup
-        self.states = {state.id: state for state in states}
+        # States, sorted by id
+        self._ids: List[int] = sorted(state.id for state in states)
+        self._index: Dict[int, int] = {
+            state_id: i for i, state_id in enumerate(self._ids)}
+        by_id = {state.id: state for state in states}
+        self._names: List[str] = [by_id[state_id].name for state_id in self._ids]
+        self._finals = bytearray(by_id[state_id].final for state_id in self._ids)
 
         # Find initial state
-        for _, state in self.states.items():
-            if state.initial:
-                self.initial_state = state
-        if self.initial_state is None:
-            print("No initial state found")
-            sys.exit(1)
-
-        for transition, dests in transitions.items():
-            # Get all transitions
-            self.transitions[transition] = {
-                self.states[dest] for dest in dests}
-            # Add the strings on the transitions to the alphabet
-            self.alphabet.add(transition.string)
+        self._initial: Optional[int] = None
+        for i, state_id in enumerate(self._ids):
+            if by_id[state_id].initial:
+                self._initial = i
+        if self._initial is None:
+            raise ValueError("No initial state found")
 
         # Look for missing states in all transitions
         self._check_ids(
-            [transition.origin for transition in self.transitions])
+            [transition.origin for transition in transitions])
         self._check_ids(
-            [dest.id for _, dests in self.transitions.items()for dest in dests])
+            [dest for _, dests in transitions.items()for dest in dests])
+
+        # The strings on the transitions, including the empty string
+        self._labels: List[str] = sorted(
+            {transition.string for transition in transitions})
+        self._label_index: Dict[str, int] = {
+            label: i for i, label in enumerate(self._labels)}
+
+        # The transitions sorted by origin and label
+        rows = sorted((self._index[transition.origin], self._label_index[transition.string], dests)
+                      for transition, dests in transitions.items())
+        self._offsets = array("l", [0]) * (len(self._ids) + 1)
+        self._edge_labels = array("l")
+        self._targets = array("l")
+        for state, label, dests in rows:
+            targets = sorted({self._index[dest] for dest in dests})
+            self._edge_labels.extend([label] * len(targets))
+            self._targets.extend(targets)
+            self._offsets[state + 1] = len(self._targets)
+        # States without transitions end where the state before them ends
+        for state in range(len(self._ids)):
+            self._offsets[state + 1] = max(self._offsets[state + 1], self._offsets[state])
+
+        self._setup()
+
+    @classmethod
+    def _from_arrays(cls, ids: List[int], names: List[str], finals: bytearray, initial: int,
+                     labels: List[str], offsets: array, edge_labels: array,
+                     targets: array) -> "Automaton":
+        """Creates an automaton directly from its compact representation
+        without validating it
+
+        Args:
+            ids (List[int]): The ids of the states, sorted
+            names (List[str]): The names of the states
+            finals (bytearray): The final flags of the states
+            initial (int): The index of the initial state
+            labels (List[str]): The strings on the transitions, sorted
+            offsets (array): The CSR offsets of the transitions of every state
+            edge_labels (array): The CSR labels of the transitions
+            targets (array): The CSR destinations of the transitions
+
+        Returns:
+            Automaton: The automaton
+        """
+        automaton = cls.__new__(cls)
+        automaton._ids, automaton._names = ids, names
+        automaton._index = {state_id: i for i, state_id in enumerate(ids)}
+        automaton._finals, automaton._initial = finals, initial
+        automaton._labels = labels
+        automaton._label_index = {label: i for i, label in enumerate(labels)}
+        automaton._offsets, automaton._edge_labels = offsets, edge_labels
+        automaton._targets = targets
+        automaton._setup()
+        return automaton
+
+    def _setup(self) -> None:
+        """Builds everything that is derived from the compact representation"""
+        self.alphabet = set(self._labels)
+        self.states = StatesView(self)
+        self.transitions = TransitionsView(self)
+
+        # Used to split input strings into symbols
+        self.symbol_trie = SymbolTrie(self.alphabet)
+
+    @property
+    def initial_state(self) -> State:
+        return self._state(self._initial)
+
+    def _state(self, index: int) -> State:
+        """Creates the State tuple of a state
+
+        Args:
+            index (int): The index of the state
+
+        Returns:
+            State: The state
+        """
+        return State(self._ids[index], self._names[index],
+                     index == self._initial, bool(self._finals[index]))
+
+    def _dests(self, state: int, label: int) -> array:
+        """Returns the destinations of a transition
+
+        Args:
+            state (int): The index of the origin
+            label (int): The index of the string on the transition
+
+        Returns:
+            array: The indices of the destinations
+        """
+        start, end = self._offsets[state], self._offsets[state + 1]
+        low = bisect_left(self._edge_labels, label, start, end)
+        return self._targets[low:bisect_right(self._edge_labels, label, low, end)]
+
+    def _state_labels(self, state: int) -> Iterator[int]:
+        """Yields the indices of the strings a state has transitions on
+
+        Args:
+            state (int): The index of the state
+
+        Yields:
+            Iterator[int]: The label indices, sorted
+        """
+        edge_labels = self._edge_labels
+        previous = -1
+        for edge in range(self._offsets[state], self._offsets[state + 1]):
+            if edge_labels[edge] != previous:
+                previous = edge_labels[edge]
+                yield previous
 
     def get_transition(self, state_id: int, symbol: str) -> Optional[Set[State]]:
         return self.transitions.get(Transition(state_id, symbol))
@@ -48,40 +165,40 @@ class Automaton:
         Args:
             ids (List[int]): The list of ids
 
-        Returns:
-            bool: True if all ids exists in the automaton
+        Raises:
+            ValueError: If an id is not a state of the automaton
         """
-        if not all(id in self.states for id in ids):
-            print("Missing states in automaton")
-            sys.exit(1)
+        missing = [id for id in ids if id not in self._index]
+        if missing:
+            raise ValueError(f"Missing states in automaton: {sorted(set(missing))}")
 
-    def _get_symbols(self, string: str) -> List[str]:
+    def _get_symbols(self, string: str) -> Optional[List[str]]:
         """Returns the symbols from a string in the right order
 
         Args:
             string (str): The string to get symbols from
 
         Returns:
-            List[str]: The symbols extracted from the string
+            Optional[List[str]]: The symbols extracted from the string or None
+            if the string contains something that is not in the alphabet
         """
-        steps, start, stop = [], 0, 1
-
-        # Don't touch this, I think it works
-        while stop <= len(string):
-            attempt = string[start:stop]
-            while attempt in self.alphabet and stop <= len(string):
-                stop += 1
-                attempt = string[start:stop]
+        if not instrumentation.ENABLED:
+            return self.symbol_trie.tokenize(string)
 
-            steps.append(string[start:stop-1])
-            start = stop-1
-            stop += 1
+        start = time.perf_counter()
+        symbols = self.symbol_trie.tokenize(string)
+        instrumentation.add_time("automaton.tokenize", time.perf_counter() - start)
+        if symbols is not None:
+            instrumentation.count("automaton.symbols", len(symbols))
+        return symbols
 
-        # Add the last substring
-        if len(string) != 1:
-            steps.append(string[start:stop])
+    def runner(self) -> Runner:
+        """Returns a runner that reads input in chunks
 
-        return steps
+        Returns:
+            Runner: The runner, starting in the initial configuration
+        """
+        return Runner(self)
 
     # This method is implemented in DFA and NFA and only
     # serves # as a placeholder here
@@ -95,3 +212,37 @@ class Automaton:
             bool: True if the string is inside the language
         """
         return False
+
+    # The configuration methods are implemented in DFA and NFA and
+    # only serve as placeholders here. They let callers step the
+    # automaton one symbol at a time
+    def initial_configuration(self) -> Any:
+        """Returns the configuration the automaton starts in
+
+        Returns:
+            Any: The initial configuration
+        """
+        return None
+
+    def next_configuration(self, configuration: Any, symbol: str) -> Any:
+        """Returns the configuration after reading a symbol
+
+        Args:
+            configuration (Any): The current configuration
+            symbol (str): The symbol to read
+
+        Returns:
+            Any: The next configuration
+        """
+        return None
+
+    def is_accepting(self, configuration: Any) -> bool:
+        """Check if a configuration accepts
+
+        Args:
+            configuration (Any): The configuration
+
+        Returns:
+            bool: True if the input read so far is inside the language
+        """
+        return False
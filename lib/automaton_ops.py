@@ -1,15 +1,21 @@
 """This module contains operations on automatons"""
 import random
-import re
 import itertools
-from typing import Callable, Dict,  Pattern, Set
+from concurrent.futures import ProcessPoolExecutor
+from typing import (Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional,
+                    Pattern, Set, Tuple, Union)
 
 from tabulate import PRESERVE_WHITESPACE, tabulate
 
+from lib import instrumentation
 from lib.automaton import Automaton
-from lib.cfg import CFG, Productions
+from lib.cfg import CFG
+from lib.compiled_dfa import DEAD, CompiledDFA
 from lib.dfa import DFA
-from lib.state import combine_states
+from lib.nfa import NFA
+from lib.state import State
+from lib.symbols import SymbolTable, Tail, fresh_names
+from lib.transition import Transition
 
 
 def verify_against_regex(
@@ -46,7 +52,8 @@ def verify_against_regex(
 def verify_against_method(
         automaton: Automaton, func: Callable[[str],
                                              int],
-        test_num: int = 10000, max_sample_num: int = 12) -> bool:
+        test_num: int = 10000, max_sample_num: int = 12,
+        exhaustive: bool = False) -> bool:
     """Verifies the automaton against a method
 
     Args:
@@ -54,10 +61,24 @@ def verify_against_method(
         func (Callable[[str], int]): The method to check against
         test_num (int, optional): The number of tests. Defaults to 10000.
         max_sample_num (int, optional): The number of symbols to construct tests from. Defaults to 12.
+        exhaustive (bool, optional): Test every string instead of test_num random ones
+            per length, see verify_exhaustive. Defaults to False.
 
     Returns:
         bool: True if they match
     """
+    if exhaustive:
+        result = verify_exhaustive(
+            automaton, func, max_sample_num - 1, min_length=1)
+        print(f"\rTested {sum(result.counts.values())} strings", end="")
+        if result.mismatch is not None:
+            if result.expected:
+                print(f"\nMethod matched on {result.mismatch} and automaton didn't")
+            else:
+                print(f"\nMethod didn't match on {result.mismatch} and automaton did")
+            return False
+        return True
+
     symbols = list(automaton.alphabet)
 
     for i in range(1, max_sample_num):
@@ -75,6 +96,288 @@ def verify_against_method(
     return True
 
 
+# The automaton and the method a worker process verifies, set by _init_worker
+_worker_automaton: Optional[Automaton] = None
+_worker_func: Optional[Callable[[str], int]] = None
+
+
+def _init_worker(automaton: Automaton, func: Callable[[str], int]) -> None:
+    global _worker_automaton, _worker_func
+    _worker_automaton, _worker_func = automaton, func
+
+
+def _verify_shard(symbols: List[str], length: int, count: int,
+                  seed: str) -> Optional[Tuple[str, bool]]:
+    """Verifies count random strings of some length in a worker process
+
+    Args:
+        symbols (List[str]): The symbols to construct tests from
+        length (int): The number of symbols in every string
+        count (int): The number of strings
+        seed (str): The seed of the shard
+
+    Returns:
+        Optional[Tuple[str, bool]]: The first mismatch and what the method
+        returned for it or None if there was no mismatch
+    """
+    # Draw the symbols of every string in the shard at once
+    chars = random.Random(seed).choices(symbols, k=length * count)
+    for i in range(0, length * count, length):
+        test = "".join(chars[i:i + length])
+        expected = bool(_worker_func(test))
+        if expected != _worker_automaton.check_string_in_language(test):
+            return test, expected
+    return None
+
+
+def _verify_parallel(automaton: Automaton, func: Callable[[str], int], name: str,
+                     test_num: int, max_sample_num: int, workers: Optional[int],
+                     seed: int, shard_size: int) -> bool:
+    """Shards the tests of verify_against_regex and verify_against_method
+    over a process pool. Every shard has its own seed derived from seed, the
+    sample size and the shard number, so a run can be reproduced. The results
+    are read in shard order so the mismatch that is reported doesn't depend on
+    timing, and the shards that haven't started are cancelled once it's found.
+
+    Args:
+        automaton (Automaton): The automaton to test
+        func (Callable[[str], int]): The picklable method to check against
+        name (str): What to call the method in the output
+        test_num (int): The number of tests per sample size
+        max_sample_num (int): The number of symbols to construct tests from
+        workers (Optional[int]): The number of processes, defaults to the number of CPUs
+        seed (int): The seed of the run
+        shard_size (int): The number of tests per shard
+
+    Returns:
+        bool: True if they match
+    """
+    # Sorted, so the symbols are in the same order in every process
+    symbols = sorted(automaton.alphabet)
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(automaton, func)) as executor:
+        shards = []
+        for i in range(1, max_sample_num):
+            for j, start in enumerate(range(0, test_num, shard_size)):
+                count = min(shard_size, test_num - start)
+                shards.append((i, executor.submit(
+                    _verify_shard, symbols, i, count, f"{seed}-{i}-{j}")))
+
+        for i, shard in shards:
+            print(f"\rTesting with sample size {i}", end="")
+            mismatch = shard.result()
+            if mismatch is not None:
+                executor.shutdown(cancel_futures=True)
+                test, expected = mismatch
+                if expected:
+                    print(f"\n{name} matched on {test} and automaton didn't")
+                else:
+                    print(f"\n{name} didn't match on {test} and automaton did")
+                return False
+    return True
+
+
+def verify_against_regex_parallel(
+        automaton: Automaton, regex: Pattern[str],
+        test_num: int = 10000, max_sample_num: int = 12, workers: Optional[int] = None,
+        seed: int = 0, shard_size: int = 1000) -> bool:
+    """Verifies the automaton against a regex using a process pool,
+    see _verify_parallel
+
+    Args:
+        automaton (Automaton): The automaton to test
+        regex (Pattern[str]): The regex to compare it with
+        test_num (int, optional): The number of tests. Defaults to 10000.
+        max_sample_num (int, optional): The number of symbols to construct tests from. Defaults to 12.
+        workers (Optional[int], optional): The number of processes. Defaults to the number of CPUs.
+        seed (int, optional): The seed of the run. Defaults to 0.
+        shard_size (int, optional): The number of tests per shard. Defaults to 1000.
+
+    Returns:
+        bool: True if they match
+    """
+    return _verify_parallel(automaton, regex.match, "Regex", test_num,
+                            max_sample_num, workers, seed, shard_size)
+
+
+def verify_against_method_parallel(
+        automaton: Automaton, func: Callable[[str], int],
+        test_num: int = 10000, max_sample_num: int = 12, workers: Optional[int] = None,
+        seed: int = 0, shard_size: int = 1000) -> bool:
+    """Verifies the automaton against a method using a process pool,
+    see _verify_parallel. The method has to be picklable, so it can't
+    be a lambda or a nested function
+
+    Args:
+        automaton (Automaton): The automaton to test
+        func (Callable[[str], int]): The method to check against
+        test_num (int, optional): The number of tests. Defaults to 10000.
+        max_sample_num (int, optional): The number of symbols to construct tests from. Defaults to 12.
+        workers (Optional[int], optional): The number of processes. Defaults to the number of CPUs.
+        seed (int, optional): The seed of the run. Defaults to 0.
+        shard_size (int, optional): The number of tests per shard. Defaults to 1000.
+
+    Returns:
+        bool: True if they match
+    """
+    return _verify_parallel(automaton, func, "Method", test_num,
+                            max_sample_num, workers, seed, shard_size)
+
+
+class ExhaustiveResult(NamedTuple):
+    """The result of verify_exhaustive"""
+    # The first string the automaton and the method disagree on
+    mismatch: Optional[str]
+    # What the method returned for the mismatch
+    expected: Optional[bool]
+    # The number of strings that were checked per length
+    counts: Dict[int, int]
+
+
+@instrumentation.timed("automaton_ops.verify_exhaustive")
+def verify_exhaustive(
+        automaton: Automaton, func: Callable[[str], int],
+        max_length: int, min_length: int = 0) -> ExhaustiveResult:
+    """Verifies the automaton against a method on every string of
+    alphabet symbols, shortest strings first. The strings are enumerated
+    depth first and the configuration of the automaton is carried along
+    each prefix, so every extension costs a single transition
+
+    Args:
+        automaton (Automaton): The automaton to test
+        func (Callable[[str], int]): The method to check against
+        max_length (int): The largest number of symbols in a string
+        min_length (int, optional): The smallest number of symbols in a string. Defaults to 0.
+
+    Returns:
+        ExhaustiveResult: The first mismatch, if any, and the number of strings checked per length
+    """
+    symbols = automaton.symbol_trie.symbols
+    # Concatenated multi-character symbols may be split differently
+    # when the string is read, those strings are checked from scratch
+    ambiguous = any(len(symbol) > 1 for symbol in symbols)
+    counts: Dict[int, int] = dict()
+    path: List[str] = []
+
+    def search(configuration, remaining: int) -> Optional[ExhaustiveResult]:
+        if remaining == 0:
+            string = "".join(path)
+            counts[len(path)] += 1
+            if ambiguous and automaton.symbol_trie.tokenize(string) != path:
+                accepted = automaton.check_string_in_language(string)
+            else:
+                accepted = automaton.is_accepting(configuration)
+            expected = bool(func(string))
+            if accepted != expected:
+                return ExhaustiveResult(string, expected, counts)
+            return None
+
+        for symbol in symbols:
+            path.append(symbol)
+            result = search(automaton.next_configuration(
+                configuration, symbol), remaining - 1)
+            path.pop()
+            if result is not None:
+                return result
+        return None
+
+    initial = automaton.initial_configuration()
+    # Iterative deepening, so shorter strings are checked first
+    # without keeping a whole level of configurations around
+    for length in range(min_length, max_length + 1):
+        counts[length] = 0
+        result = search(initial, length)
+        if result is not None:
+            return result
+    return ExhaustiveResult(None, None, counts)
+
+
+def find_distinguishing_strings(dfa: DFA) -> Dict[Tuple[int, int], str]:
+    """Finds a shortest distinguishing string for every pair of
+    distinguishable states. Pairs with a final and a non-final state
+    are distinguished by the empty string, and the inverse transitions
+    are followed breadth first from there, so every pair is visited once.
+    Missing transitions are treated as going to an implicit trap state.
+
+    If one symbol is a prefix of another, a witness can be read back as
+    other symbols. Witnesses that don't tell their states apart are then
+    replaced by one from a slower search over characters, and pairs that
+    no string tells apart are left out
+
+    Args:
+        dfa (DFA): The DFA
+
+    Returns:
+        Dict[Tuple[int, int], str]: The distinguishing strings keyed by pairs of
+        state ids, with the larger id first. Pairs that are missing are equivalent
+    """
+    compiled = dfa.compile()
+    table, width = compiled.table, compiled.num_symbols
+    sink = len(compiled.state_ids)
+    finals = [bool(final) for final in compiled.finals] + [False]
+
+    # inverse[symbol][state] are the states that go to state on symbol
+    inverse: List[List[List[int]]] = [[[] for _ in range(sink + 1)]
+                                      for _ in range(width)]
+    for state in range(sink):
+        for symbol in range(width):
+            dest = table[state * width + symbol]
+            inverse[symbol][sink if dest == DEAD else dest].append(state)
+    for symbol in range(width):
+        inverse[symbol][sink].append(sink)
+
+    witnesses: Dict[Tuple[int, int], str] = dict()
+    queue = []
+    for p in range(sink + 1):
+        for q in range(p):
+            if finals[p] != finals[q]:
+                witnesses[(p, q)] = ""
+                queue.append((p, q))
+
+    # Every round handles the pairs with witnesses of the same length
+    rounds, round_end = 0, 0
+    for i, (p, q) in enumerate(queue):
+        if i == round_end:
+            rounds, round_end = rounds + 1, len(queue)
+        witness = witnesses[(p, q)]
+        for symbol in range(width):
+            for p_pred in inverse[symbol][p]:
+                for q_pred in inverse[symbol][q]:
+                    if p_pred == q_pred:
+                        continue
+                    pair = (p_pred, q_pred) if p_pred > q_pred else (
+                        q_pred, p_pred)
+                    if pair not in witnesses:
+                        witnesses[pair] = compiled.symbols[symbol] + witness
+                        queue.append(pair)
+
+    if instrumentation.ENABLED:
+        instrumentation.count("distinguishability.rounds", rounds)
+        instrumentation.count("distinguishability.pairs", len(queue))
+
+    if not _prefix_free(compiled.symbols):
+        def accepts_from(state: int, string: str) -> bool:
+            symbols = compiled.encode(string)
+            if state == sink or symbols is None:
+                return False
+            state = compiled.run(symbols, state)
+            return state != DEAD and bool(compiled.finals[state])
+
+        for (p, q), witness in list(witnesses.items()):
+            if p == sink or accepts_from(p, witness) != accepts_from(q, witness):
+                continue
+            witness = _string_difference(compiled, p, compiled, DEAD if q == sink else q)
+            if witness is None:
+                del witnesses[(p, q)]
+            else:
+                witnesses[(p, q)] = witness
+
+    ids = compiled.state_ids
+    return {(max(ids[p], ids[q]), min(ids[p], ids[q])): witness
+            for (p, q), witness in witnesses.items() if p != sink}
+
+
+@instrumentation.timed("automaton_ops.create_distinguishability_table")
 def create_distinguishability_table(dfa: DFA, show_table: bool = False,
                                     show_names: bool = True) -> Dict[int,
                                                                      Dict[int, str]]:
@@ -85,30 +388,12 @@ def create_distinguishability_table(dfa: DFA, show_table: bool = False,
     sorted_ids = [k for k in dfa.states]
     sorted_ids.sort()
 
+    # Mark every pair that has a distinguishing string with an X
+    witnesses = find_distinguishing_strings(dfa)
     dict_table = dict(dict())
-    # First iteration
     for i, id1 in enumerate(sorted_ids):
-        dict_table[id1] = dict()
-        for id2 in sorted_ids[:i]:
-            # Check if the states differ and if they do add an X
-            dict_table[id1][id2] = ("X"if dfa.states.get(
-                id1).final != dfa.states.get(id2).final else "")
-
-    # Second iteration
-    # This can be done in the loop above but this way
-    # makes it more clear what is going on
-    found = True
-    while found:
-        found = False
-        for id1, v1 in dict_table.items():
-            for id2 in {k: v for k, v in v1.items() if v != "X"}:
-                for symbol in dfa.alphabet:
-                    id1_new = dfa.get_transition(id1, symbol).id
-                    id2_new = dfa.get_transition(id2, symbol).id
-                    if dict_table.get(id1_new).get(id2_new) == "X" or dict_table.get(id2_new).get(
-                            id1_new):
-                        dict_table[id1][id2] = "X"
-                        found = True
+        dict_table[id1] = {id2: "X" if (id1, id2) in witnesses else ""
+                           for id2 in sorted_ids[:i]}
 
     if show_table:
         # Convert to list
@@ -125,193 +410,827 @@ def create_distinguishability_table(dfa: DFA, show_table: bool = False,
     return dict_table
 
 
-def product_construction(dfa1: DFA, dfa2: DFA) -> DFA:
+# Acceptance rules of product_construction, they get whether
+# each DFA accepts and return whether the product accepts
+PRODUCT_OPERATIONS: Dict[str, Callable[[bool, bool], bool]] = {
+    "intersection": lambda final1, final2: final1 and final2,
+    "union": lambda final1, final2: final1 or final2,
+    "difference": lambda final1, final2: final1 and not final2,
+    "symmetric_difference": lambda final1, final2: final1 != final2,
+}
+
+
+@instrumentation.timed("automaton_ops.product_construction")
+def product_construction(dfa1: DFA, dfa2: DFA,
+                         operation: Union[str, Callable[[bool, bool], bool]] = "intersection") -> DFA:
+    """Creates the product of two DFAs. Only the pairs of states that are
+    reachable from the pair of initial states are created. Missing transitions
+    are treated as going to an implicit trap state
+
+    Args:
+        dfa1 (DFA): The first DFA
+        dfa2 (DFA): The second DFA
+        operation (Union[str, Callable[[bool, bool], bool]], optional): The name of an
+            operation in PRODUCT_OPERATIONS or an acceptance rule. Defaults to "intersection".
+
+    Returns:
+        DFA: The product, the state ids are assigned in the order the pairs are found
+    """
     # Make sure they operate over the same alphabet
-    if dfa1.alphabet.difference(dfa2.alphabet) != dfa1.alphabet:
+    if dfa1.alphabet != dfa2.alphabet:
         raise ValueError("The alphabets of the automatons differ")
+    if isinstance(operation, str):
+        if operation not in PRODUCT_OPERATIONS:
+            raise ValueError(f"Unknown operation {operation}")
+        operation = PRODUCT_OPERATIONS[operation]
 
-    initial_state = combine_states(dfa1.initial_state, dfa2 .initial_state,
-                                   dfa1.initial_state.final or dfa2.initial_state.final)
+    compiled1, compiled2 = dfa1.compile(), dfa2.compile()
+    table1, table2 = compiled1.table, compiled2.table
+    width = compiled1.num_symbols
+    sink1, sink2 = len(compiled1.state_ids), len(compiled2.state_ids)
+    # The pair (p, q) has the index p * stride + q
+    stride = sink2 + 1
 
-    # todo not done
+    def delta(table, sink: int, state: int, symbol: int) -> int:
+        if state == sink:
+            return sink
+        dest = table[state * width + symbol]
+        return sink if dest == DEAD else dest
+
+    def is_final(compiled, sink: int, state: int) -> bool:
+        return state != sink and bool(compiled.finals[state])
+
+    # The pair of trap states can be left out if it doesn't accept
+    dropped = sink1 * stride + sink2 if not operation(False, False) else None
+
+    initial = compiled1.initial * stride + compiled2.initial
+    new_ids = {initial: 0}
+    queue = [initial]
+    states, transitions = set(), dict()
+    for pair in queue:
+        p, q = divmod(pair, stride)
+        new_id = new_ids[pair]
+        name1 = dfa1.states[compiled1.state_ids[p]].name if p != sink1 else "trap"
+        name2 = dfa2.states[compiled2.state_ids[q]].name if q != sink2 else "trap"
+        states.add(State(new_id, name1 + "_" + name2, new_id == 0,
+                         bool(operation(is_final(compiled1, sink1, p),
+                                        is_final(compiled2, sink2, q)))))
+
+        for symbol in range(width):
+            dest = delta(table1, sink1, p, symbol) * stride + \
+                delta(table2, sink2, q, symbol)
+            if dest == dropped:
+                continue
+            if dest not in new_ids:
+                new_ids[dest] = len(new_ids)
+                queue.append(dest)
+            transitions[Transition(new_id, compiled1.symbols[symbol])] = [
+                new_ids[dest]]
+
+    return DFA(states, transitions)
+
+
+def _prefix_free(symbols: Iterable[str]) -> bool:
+    """True if no symbol is a prefix of another, then every string is
+    split into symbols in at most one way"""
+    ordered = sorted(symbols)
+    return not any(b.startswith(a) for a, b in zip(ordered, ordered[1:]))
+
+
+class _LongestMatch:
+    """Runs a compiled DFA one character at a time, splitting the input
+    into symbols like SymbolTrie.tokenize does. A configuration is a state
+    and the characters that haven't been split off yet, which are kept
+    while they could still be the start of a longer symbol
+    """
+
+    def __init__(self, compiled: CompiledDFA) -> None:
+        self.compiled = compiled
+        # Every proper prefix of a symbol, including ""
+        self.prefixes = {symbol[:i] for symbol in compiled.symbols
+                         for i in range(len(symbol))}
+
+    def _split(self, state: int, pending: str) -> Tuple[int, str]:
+        # Take the longest symbol the pending characters start with
+        for end in range(len(pending), 0, -1):
+            index = self.compiled.symbol_index.get(pending[:end])
+            if index is not None:
+                return self.compiled.step(state, index), pending[end:]
+        return DEAD, ""
+
+    def feed(self, state: int, pending: str, char: str) -> Tuple[int, str]:
+        pending += char
+        while state != DEAD and pending and pending not in self.prefixes:
+            state, pending = self._split(state, pending)
+        return (DEAD, "") if state == DEAD else (state, pending)
+
+    def accepting(self, state: int, pending: str) -> bool:
+        while state != DEAD and pending:
+            state, pending = self._split(state, pending)
+        return state != DEAD and bool(self.compiled.finals[state])
+
+
+def _string_difference(compiled1: CompiledDFA, state1: int,
+                       compiled2: CompiledDFA, state2: int) -> Optional[str]:
+    """Finds a shortest string that is accepted from exactly one of two
+    states, reading strings the way check_string_in_language does. The
+    search is over characters instead of symbols, so it is exact even if
+    one symbol is a prefix of another
+
+    Args:
+        compiled1 (CompiledDFA): The first DFA
+        state1 (int): The state of the first DFA to start in, or DEAD
+        compiled2 (CompiledDFA): The second DFA
+        state2 (int): The state of the second DFA to start in, or DEAD
+
+    Returns:
+        Optional[str]: The string or None if there is none
+    """
+    side1, side2 = _LongestMatch(compiled1), _LongestMatch(compiled2)
+    chars = sorted({char for compiled in (compiled1, compiled2)
+                    for symbol in compiled.symbols for char in symbol})
+    initial = ((state1, ""), (state2, ""))
+    parents: Dict[tuple, Optional[Tuple[tuple, str]]] = {initial: None}
+    queue = [initial]
+    for node in queue:
+        if side1.accepting(*node[0]) != side2.accepting(*node[1]):
+            path = []
+            while parents[node] is not None:
+                node, char = parents[node]
+                path.append(char)
+            return "".join(reversed(path))
+        for char in chars:
+            next_node = (side1.feed(*node[0], char), side2.feed(*node[1], char))
+            if next_node not in parents:
+                parents[next_node] = (node, char)
+                queue.append(next_node)
     return None
 
 
+@instrumentation.timed("automaton_ops.equivalent")
+def equivalent(dfa1: DFA, dfa2: DFA) -> Tuple[bool, Optional[str]]:
+    """Checks if two DFAs accept the same language with the
+    Hopcroft-Karp union-find algorithm. If they don't, a breadth first
+    search over the pairs of states finds a shortest counterexample.
+    Missing transitions and symbols are treated as going to an
+    implicit trap state.
+
+    If one symbol is a prefix of another, a sequence of symbols can be
+    read back as other symbols. Then a counterexample that both DFAs
+    agree on is replaced by one from a slower search over characters,
+    which is also used when the DFAs have different overlapping alphabets
+
+    Args:
+        dfa1 (DFA): The first DFA
+        dfa2 (DFA): The second DFA
+
+    Returns:
+        Tuple[bool, Optional[str]]: True and None if the DFAs are equivalent,
+        otherwise False and a shortest string that only one of them accepts
+    """
+    compiled1, compiled2 = dfa1.compile(), dfa2.compile()
+    symbols = sorted(set(compiled1.symbols) | set(compiled2.symbols))
+    prefix_free = _prefix_free(symbols)
+    if not prefix_free and set(compiled1.symbols) != set(compiled2.symbols):
+        # The DFAs split strings into different symbols
+        witness = _string_difference(compiled1, compiled1.initial,
+                                     compiled2, compiled2.initial)
+        return witness is None, witness
+    sink1, sink2 = len(compiled1.state_ids), len(compiled2.state_ids)
+
+    def successors(compiled, sink: int) -> List[List[int]]:
+        # successors[state][i] is where state goes on symbols[i]
+        result = []
+        for state in range(sink):
+            row = []
+            for symbol in symbols:
+                index = compiled.symbol_index.get(symbol)
+                dest = DEAD if index is None else compiled.step(state, index)
+                row.append(sink if dest == DEAD else dest)
+            result.append(row)
+        result.append([sink] * len(symbols))
+        return result
+
+    delta1, delta2 = successors(compiled1, sink1), successors(compiled2, sink2)
+    finals1 = [bool(final) for final in compiled1.finals] + [False]
+    finals2 = [bool(final) for final in compiled2.finals] + [False]
+
+    # The states of dfa2 come after the states of dfa1 in the union-find
+    offset = sink1 + 1
+    parent = list(range(offset + sink2 + 1))
+
+    def find(node: int) -> int:
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    parent[find(compiled1.initial)] = find(offset + compiled2.initial)
+    stack = [(compiled1.initial, compiled2.initial)]
+    while stack:
+        p, q = stack.pop()
+        if finals1[p] != finals2[q]:
+            break
+        for p_next, q_next in zip(delta1[p], delta2[q]):
+            root1, root2 = find(p_next), find(offset + q_next)
+            if root1 != root2:
+                parent[root1] = root2
+                stack.append((p_next, q_next))
+    else:
+        return True, None
+
+    # Find a shortest counterexample, parents maps a pair to the
+    # pair and symbol it was found from
+    initial = (compiled1.initial, compiled2.initial)
+    parents: Dict[Tuple[int, int], Optional[Tuple[Tuple[int, int], str]]] = {
+        initial: None}
+    queue = [initial]
+    for pair in queue:
+        p, q = pair
+        if finals1[p] != finals2[q]:
+            break
+        for symbol, p_next, q_next in zip(symbols, delta1[p], delta2[q]):
+            if (p_next, q_next) not in parents:
+                parents[(p_next, q_next)] = (pair, symbol)
+                queue.append((p_next, q_next))
+
+    path = []
+    while parents[pair] is not None:
+        pair, symbol = parents[pair]
+        path.append(symbol)
+    witness = "".join(reversed(path))
+    if prefix_free or (dfa1.check_string_in_language(witness)
+                       != dfa2.check_string_in_language(witness)):
+        return False, witness
+
+    # The symbols of the witness are read as other symbols
+    witness = _string_difference(compiled1, compiled1.initial,
+                                 compiled2, compiled2.initial)
+    return witness is None, witness
+
+
+def _iter_bits(mask: int):
+    """Yields the positions of the set bits in a mask"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+@instrumentation.timed("automaton_ops.nfa_to_dfa")
+def nfa_to_dfa(nfa: NFA) -> DFA:
+    """Converts an NFA to a DFA using the subset construction.
+    Sets of NFA states are represented as int bitmasks and only
+    the subsets reachable from the initial state are created.
+    The empty subset becomes the trap state, so the DFA is complete
+
+    Args:
+        nfa (NFA): The NFA to convert
+
+    Returns:
+        DFA: The DFA, the state ids are assigned in the order the subsets are found
+    """
+    def to_mask(indices) -> int:
+        mask = 0
+        for index in indices:
+            mask |= 1 << index
+        return mask
+
+    closures = [to_mask(closure) for closure in nfa._state_closures]
+    final_mask = to_mask(index for index, final in enumerate(nfa._finals) if final)
+
+    # moves[symbol][i] is the e closure of where state i goes on symbol.
+    # A step on a symbol also steps on all symbols it starts with
+    symbols = nfa.symbol_trie.symbols
+    moves: List[List[int]] = []
+    for symbol in symbols:
+        step = [symbol] + nfa.nfa_transition_table.get(symbol, [])
+        labels = [nfa._label_index[string]
+                  for string in step if string in nfa._label_index]
+        row = []
+        for index in range(len(nfa._ids)):
+            dests = 0
+            for label in labels:
+                dests |= to_mask(nfa._dests(index, label))
+            closure = 0
+            for i in _iter_bits(dests):
+                closure |= closures[i]
+            row.append(closure)
+        moves.append(row)
+
+    initial = closures[nfa._initial]
+    subsets: Dict[int, int] = {initial: 0}
+    worklist = [initial]
+    transitions: Dict[Transition, List[int]] = dict()
+    while worklist:
+        subset = worklist.pop()
+        origin = subsets[subset]
+        for symbol, row in zip(symbols, moves):
+            dest = 0
+            for i in _iter_bits(subset):
+                dest |= row[i]
+            if dest not in subsets:
+                subsets[dest] = len(subsets)
+                worklist.append(dest)
+            transitions[Transition(origin, symbol)] = [subsets[dest]]
+
+    if instrumentation.ENABLED:
+        instrumentation.count("nfa_to_dfa.subsets", len(subsets))
+    states = {State(_id, "{" + ",".join(nfa._names[i] for i in _iter_bits(subset)) + "}",
+                    _id == 0, bool(subset & final_mask))
+              for subset, _id in subsets.items()}
+    return DFA(states, transitions)
+
+
+@instrumentation.timed("automaton_ops.minimize")
+def minimize(dfa: DFA, trim: bool = True) -> Tuple[DFA, Dict[int, int]]:
+    """Minimizes a DFA with Hopcroft's partition refinement algorithm.
+    Missing transitions are treated as going to an implicit trap state
+
+    Args:
+        dfa (DFA): The DFA to minimize
+        trim (bool, optional): Remove unreachable states first. Defaults to True.
+
+    Returns:
+        Tuple[DFA, Dict[int, int]]: The minimized DFA and a mapping from the ids
+        of the old states to the ids of the new states
+    """
+    compiled = dfa.compile()
+    table, width = compiled.table, compiled.num_symbols
+    # Index of the implicit trap state
+    sink = len(compiled.state_ids)
+
+    def delta(state: int, symbol: int) -> int:
+        if state == sink:
+            return sink
+        dest = table[state * width + symbol]
+        return sink if dest == DEAD else dest
+
+    if trim:
+        reachable = {compiled.initial}
+        stack = [compiled.initial]
+        while stack:
+            state = stack.pop()
+            for symbol in range(width):
+                dest = delta(state, symbol)
+                if dest not in reachable:
+                    reachable.add(dest)
+                    stack.append(dest)
+        reachable.add(sink)
+    else:
+        reachable = set(range(sink + 1))
+
+    # inverse[symbol][state] are the states that go to state on symbol
+    inverse: List[Dict[int, List[int]]] = [dict() for _ in range(width)]
+    for state in reachable:
+        for symbol in range(width):
+            inverse[symbol].setdefault(
+                delta(state, symbol), []).append(state)
+
+    finals = {state for state in reachable
+              if state != sink and compiled.finals[state]}
+    # Copies, splitting a block changes it in place
+    blocks = [set(block) for block in (finals, reachable - finals) if block]
+    block_of = {state: i for i, block in enumerate(blocks)
+                for state in block}
+
+    # Only the smaller of the two initial blocks has to be a splitter
+    smallest = min(range(len(blocks)), key=lambda i: len(blocks[i]))
+    waiting = {(smallest, symbol) for symbol in range(width)}
+    while waiting:
+        splitter, symbol = waiting.pop()
+        preds = inverse[symbol]
+        # The states that go into the splitter on the symbol, by block
+        touched: Dict[int, Set[int]] = dict()
+        for state in blocks[splitter]:
+            for pred in preds.get(state, ()):
+                touched.setdefault(block_of[pred], set()).add(pred)
+
+        for i, inside in touched.items():
+            if len(inside) == len(blocks[i]):
+                continue
+            # Split the block, the new block gets a new index
+            blocks[i] -= inside
+            new = len(blocks)
+            blocks.append(inside)
+            for state in inside:
+                block_of[state] = new
+            for c in range(width):
+                if (i, c) in waiting:
+                    waiting.add((new, c))
+                else:
+                    waiting.add(
+                        (new if len(inside) <= len(blocks[i]) else i, c))
+
+    # Drop the block of the trap state if no real state ended up in it
+    dropped = block_of[sink] if len(blocks[block_of[sink]]) == 1 else None
+
+    # Number the blocks in the order they are found from the initial state
+    new_ids = {block_of[compiled.initial]: 0}
+    queue = [block_of[compiled.initial]]
+    for block in queue:
+        state = next(iter(blocks[block]))
+        for symbol in range(width):
+            dest = block_of[delta(state, symbol)]
+            if dest != dropped and dest not in new_ids:
+                new_ids[dest] = len(new_ids)
+                queue.append(dest)
+    if not trim:
+        for block in range(len(blocks)):
+            if block != dropped and block not in new_ids:
+                new_ids[block] = len(new_ids)
+
+    states, transitions = set(), dict()
+    for block, new_id in new_ids.items():
+        members = sorted(compiled.state_ids[state]
+                         for state in blocks[block] if state != sink)
+        name = "{" + ",".join(dfa.states[_id].name for _id in members) + "}"
+        state = next(iter(blocks[block]))
+        states.add(State(new_id, name, new_id == 0, state in finals))
+        for symbol in range(width):
+            dest = block_of[delta(state, symbol)]
+            if dest != dropped:
+                transitions[Transition(new_id, compiled.symbols[symbol])] = [
+                    new_ids[dest]]
+
+    mapping = {compiled.state_ids[state]: new_ids[block_of[state]]
+               for state in reachable if state != sink}
+    return DFA(states, transitions), mapping
+
+
 def gen_new_variabele(variables: Set[str]) -> str:
-    new_var = "A"
-    # Get new variable
-    while new_var in variables:
-        new_var = chr((ord(new_var)+1-65) % 26+65)
-    return new_var
+    # Never runs out, after Z comes A1
+    return next(name for name in fresh_names() if name not in variables)
 
 
+@instrumentation.timed("automaton_ops.convert_to_chomsky")
 def convert_to_chomsky(cfg: CFG, show_steps=False) -> CFG:
-    prod = cfg.get_productions()
-    prod.add_production("P", cfg.get_start_state())
-    new = CFG("P'", prod)
+    """Converts a grammar to Chomsky normal form with the START, BIN,
+    DEL, UNIT and TERM steps, in that order. The productions are copied
+    once and every step changes that copy in place
 
-    a = bin(cfg, show_steps)
-    print("== Done with bin ==")
-    print(a)
-    print("===================")
+    Args:
+        cfg (CFG): The grammar, "!" is the empty string
+        show_steps (bool, optional): Print what every step does. Defaults to False.
+
+    Returns:
+        CFG: The grammar in Chomsky normal form
+    """
+    productions = cfg.get_productions()
+    raw = productions.get_dict_productions_writable()
+    symbols = productions.writable_symbols()
 
-    b = dell(a, show_steps)
-    print("== Done with del ==")
-    print(b)
-    print("===================")
+    # START: a new start variable that is never on the right side
+    start = symbols.fresh_variable()
+    raw[start] = [(symbols.get(cfg.get_start_state()),)]
+    if show_steps:
+        print(f"Adding the new start variable {symbols.name(start)} -> {cfg.get_start_state()}")
 
-    c = unit(b, show_steps)
-    print("== Done with unit ==")
-    print(c)
-    print("====================")
+    for name, step in [("bin", lambda: _bin(raw, symbols, show_steps)),
+                       ("del", lambda: _del(raw, symbols, start, show_steps)),
+                       ("unit", lambda: _unit(raw, symbols, show_steps)),
+                       ("term", lambda: _term(raw, symbols, show_steps))]:
+        with instrumentation.timer(f"cnf.{name}"):
+            step()
+        if show_steps:
+            print(f"== Done with {name} ==")
+            print(productions)
+            print("=" * len(f"== Done with {name} =="))
 
-    d = term(c, show_steps)
-    print("== Done with term ==")
-    print(d)
-    print("====================")
+    return CFG(symbols.name(start), productions)
 
 
 def bin(cfg: CFG, show_steps: bool) -> CFG:
-    variables = cfg.get_variables()
-    new_productions = Productions()
-    for head, tail in cfg.get_productions().items():
-        i = 0
-        while i < len(tail):
-            if len(tail[i]) <= 2:
+    productions = cfg.get_productions()
+    _bin(productions.get_dict_productions_writable(),
+         productions.writable_symbols(), show_steps)
+    return CFG(cfg.get_start_state(), productions)
+
+
+def dell(cfg: CFG, show_steps: bool) -> CFG:
+    productions = cfg.get_productions()
+    symbols = productions.writable_symbols()
+    _del(productions.get_dict_productions_writable(), symbols,
+         symbols.get(cfg.get_start_state()), show_steps)
+    return CFG(cfg.get_start_state(), productions)
+
+
+def unit(cfg: CFG, show_steps: bool) -> CFG:
+    productions = cfg.get_productions()
+    _unit(productions.get_dict_productions_writable(),
+          productions.writable_symbols(), show_steps)
+    return CFG(cfg.get_start_state(), productions)
+
+
+def term(cfg: CFG, show_steps: bool) -> CFG:
+    productions = cfg.get_productions()
+    _term(productions.get_dict_productions_writable(),
+          productions.writable_symbols(), show_steps)
+    return CFG(cfg.get_start_state(), productions)
+
+
+def _bin(productions: Dict[int, List[Tail]], symbols: SymbolTable, show_steps: bool) -> None:
+    """Splits tails longer than two symbols into chains of new variables, in place
+
+    Args:
+        productions (Dict[int, List[Tail]]): The productions
+        symbols (SymbolTable): The symbols, new variables are added to it
+        show_steps (bool): Print what is done
+    """
+    name, format_tail = symbols.name, symbols.format_tail
+    for head in list(productions):
+        tails = productions[head]
+        for i, tail in enumerate(tails):
+            if len(tail) <= 2:
                 if show_steps:
-                    print(f"{head} -> {tail[i]} is already valid")
-                new_productions.add_production(head, tail[i])
-                i += 1
+                    print(f"{name(head)} -> {format_tail(tail)} is already valid")
                 continue
 
             if show_steps:
-                print(f"{head} -> {tail[i]} is too large")
-
-            new_head = head
-            # When this loop finishes there will be 2
-            # variables (or terminals) left
-            j = 0
-            while j < len(tail[i])-2:
-                # Find a new variable that already isn't in variables
-                new_var = gen_new_variabele(variables)
-                new_tail = tail[i][j] + new_var
+                print(f"{name(head)} -> {format_tail(tail)} is too large")
+            # The first symbol stays in this production and the
+            # rest is derived by a chain of new variables
+            new_var = symbols.fresh_variable()
+            tails[i] = (tail[0], new_var)
+            if show_steps:
+                print(f"Creating a new production {name(head)} -> {format_tail(tails[i])}")
+            for j in range(1, len(tail) - 2):
+                next_var = symbols.fresh_variable()
+                productions[new_var] = [(tail[j], next_var)]
                 if show_steps:
-                    print(f"Creating a new production {new_head} -> {new_tail}")
-                new_productions.add_production(new_head, new_tail)
-
-                variables.add(new_var)
-                # Set the new variable to the old variable
-                new_head = new_var
-                j += 1
-
-            # Get last two variables (or terminals) from the tail
-            new_tail = tail[i][j] + tail[i][j+1]
+                    print(f"Creating a new production {name(new_var)} -> "
+                          f"{format_tail(productions[new_var][0])}")
+                new_var = next_var
+            productions[new_var] = [tail[-2:]]
             if show_steps:
-                print(f"Creating the last production {new_var} -> {new_tail}")
-            new_productions.add_production(new_var, new_tail)
-            i += 1
+                print(f"Creating the last production {name(new_var)} -> {format_tail(tail[-2:])}")
 
-    return CFG(cfg.get_start_state(), new_productions)
 
+def _nullables(productions: Dict[int, List[Tail]]) -> Set[int]:
+    """Finds the nullable variables with a worklist. Every tail counts
+    how many of its symbols are not known to be nullable, and a head
+    becomes nullable when one of its counts reaches zero
 
-def dell(cfg: CFG, show_steps: bool) -> CFG:
-    new_cfg = CFG(cfg.get_start_state(), cfg.get_productions())
-    # Set of nullable variables
-    nullables = set()
+    Args:
+        productions (Dict[int, List[Tail]]): The productions
 
-    # Find all variables that are nullable in one step
-    for head, tails in cfg.get_productions().items():
+    Returns:
+        Set[int]: The nullable variables
+    """
+    heads: List[int] = []
+    counts: List[int] = []
+    # occurrences[variable] are the tails the variable is in, once per occurrence
+    occurrences: Dict[int, List[int]] = dict()
+    nullables = set()
+    worklist = []
+    for head, tails in productions.items():
         for tail in tails:
-            if tail == "!":
-                if show_steps:
-                    print(f"{head} -> {tail} is a nullable symbol")
+            if not tail:
+                if head not in nullables:
+                    nullables.add(head)
+                    worklist.append(head)
+                continue
+            # Tails with terminals can never reach zero
+            if all(symbol in productions for symbol in tail):
+                for symbol in tail:
+                    occurrences.setdefault(symbol, []).append(len(counts))
+                heads.append(head)
+                counts.append(len(tail))
+
+    while worklist:
+        variable = worklist.pop()
+        for index in occurrences.get(variable, ()):
+            counts[index] -= 1
+            head = heads[index]
+            if counts[index] == 0 and head not in nullables:
                 nullables.add(head)
+                worklist.append(head)
+    return nullables
 
-    for nullable in nullables:
-        new_cfg.remove_production(nullable, "!")
-        for head, tails in new_cfg.get_dict_productions_raw().items():
-            new_tails = tails.copy()
-            for tail in tails:
-                # Check if tail contains nullable symbol
-                if tail.count(nullable) > 0:
-                    if show_steps:
-                        print(f"{head} -> {tail} contains nullabe symbols")
 
-                    # Find all indexes
-                    indexes = [m.start() for m in re.finditer(nullable, tail)]
-                    # Get all combinations
-                    for L in range(1, len(indexes)+1):
-                        for subset in itertools.combinations(indexes, L):
-                            listy = list(subset)
-                            listy.sort()
-                            new_tail = tail
-                            for i, pos in enumerate(listy):
-                                new_tail = new_tail[:pos-i]+new_tail[pos-i+1:]
-                            if show_steps:
-                                print(f"Adding {head} -> {new_tail}")
-                            new_tails.append(new_tail)
+def _del(productions: Dict[int, List[Tail]], symbols: SymbolTable,
+         start: Optional[int], show_steps: bool) -> None:
+    """Removes empty productions in place, every production gets all
+    the variants where some of its nullable variables are left out
 
-            # Add the new tails found
-            for new_tail in set(new_tails).difference(tails):
-                tails.append(new_tail)
+    Args:
+        productions (Dict[int, List[Tail]]): The productions
+        symbols (SymbolTable): The symbols
+        start (Optional[int]): The start variable, it keeps its empty production
+        show_steps (bool): Print what is done
+    """
+    nullables = _nullables(productions)
+    name, format_tail = symbols.name, symbols.format_tail
+    if show_steps:
+        for nullable in sorted(map(name, nullables)):
+            print(f"{nullable} is a nullable symbol")
 
-    return new_cfg
+    for head, tails in productions.items():
+        new_tails = []
+        seen = set()
+        for tail in tails:
+            if not tail:
+                continue
+            positions = [i for i, symbol in enumerate(tail) if symbol in nullables]
+            if positions and show_steps:
+                print(f"{name(head)} -> {format_tail(tail)} contains nullabe symbols")
+            # Leave out every subset of the nullable positions
+            for size in range(len(positions) + 1):
+                for subset in itertools.combinations(positions, size):
+                    skip = set(subset)
+                    new_tail = tuple(symbol for i, symbol in enumerate(tail)
+                                     if i not in skip)
+                    if not new_tail or new_tail in seen:
+                        continue
+                    seen.add(new_tail)
+                    new_tails.append(new_tail)
+                    if size and show_steps:
+                        print(f"Adding {name(head)} -> {format_tail(new_tail)}")
+        if head == start and head in nullables:
+            new_tails.append(())
+        tails[:] = new_tails
 
+    # Variables that only derived the empty string have no tails left,
+    # remove them and every tail that uses them, which can empty more heads
+    users: Dict[int, Set[int]] = dict()
+    for head, tails in productions.items():
+        for tail in tails:
+            for symbol in tail:
+                users.setdefault(symbol, set()).add(head)
+    worklist = [head for head, tails in productions.items() if not tails and head != start]
+    while worklist:
+        variable = worklist.pop()
+        if variable not in productions:
+            continue
+        del productions[variable]
+        if show_steps:
+            print(f"Removing {name(variable)} since it only derives the empty string")
+        for head in users.get(variable, ()):
+            tails = productions.get(head)
+            if not tails:
+                continue
+            tails[:] = [tail for tail in tails if variable not in tail]
+            if not tails and head != start:
+                worklist.append(head)
 
-def unit(cfg: CFG, show_steps: bool) -> CFG:
-    productions = cfg.get_productions()
-    new_cfg = CFG(cfg.get_start_state(), cfg.get_productions())
-
-    while True:
-        # Find unit pairs
-        unit_pairs = set()
-        for head, tails in new_cfg.get_productions().items():
-            for tail in tails:
-                if tail in productions:
-                    unit_pairs.add((head, tail))
-
-        # Break when can't find any more unit pairs
-        if len(unit_pairs) == 0:
-            break
 
-        for pair in unit_pairs:
-            head, tt = pair
-            new_tails = []
-            # Remove the unit pair
-            new_cfg.get_dict_productions_raw()[head].remove(tt)
+def _unit(productions: Dict[int, List[Tail]], symbols: SymbolTable, show_steps: bool) -> None:
+    """Removes unit productions in place. Every variable gets the
+    non-unit tails of all variables it reaches through unit productions
+
+    Args:
+        productions (Dict[int, List[Tail]]): The productions
+        symbols (SymbolTable): The symbols
+        show_steps (bool): Print what is done
+    """
+    def is_unit(tail: Tail) -> bool:
+        return len(tail) == 1 and tail[0] in productions
+
+    units = {head: [tail[0] for tail in tails if is_unit(tail)]
+             for head, tails in productions.items()}
+    kept = {head: [tail for tail in tails if not is_unit(tail)]
+            for head, tails in productions.items()}
+    name, format_tail = symbols.name, symbols.format_tail
+
+    for head in productions:
+        # Find everything reachable through unit productions
+        reachable = {head}
+        worklist = [head]
+        while worklist:
+            for variable in units[worklist.pop()]:
+                if variable not in reachable:
+                    reachable.add(variable)
+                    worklist.append(variable)
+
+        new_tails = list(kept[head])
+        seen = set(new_tails)
+        for variable in units[head]:
             if show_steps:
-                print(f"Removing unit pair {head} -> {tt}")
+                print(f"Removing unit pair {name(head)} -> {name(variable)}")
+        for variable in reachable - {head}:
+            for tail in kept[variable]:
+                if tail not in seen:
+                    seen.add(tail)
+                    new_tails.append(tail)
+                    if show_steps:
+                        print(f"Adding {name(head)} -> {format_tail(tail)} since we had "
+                              f"that {name(variable)} -> {format_tail(tail)}")
+        productions[head] = new_tails
 
-            for tail in new_cfg.get_dict_productions_raw()[tt]:
-                new_tails.append(tail)
-            for new_tail in new_tails:
-                if show_steps:
-                    print(f"Adding {head} -> {new_tail} since we had that {tt} -> {new_tail}")
-                new_cfg.add_production(head, new_tail)
-    # new_cfg.remove_unreachable_productions()
-    return new_cfg
 
+def _term(productions: Dict[int, List[Tail]], symbols: SymbolTable, show_steps: bool) -> None:
+    """Replaces the terminals in tails with two or more symbols by variables, in place
 
-def term(cfg: CFG, show_steps: bool) -> CFG:
-    productions = cfg.get_productions()
-    variables = cfg.get_variables()
-    new_productions = Productions()
-    for head, tails in productions.items():
-        for tail in tails:
-            if len(tail) < 2 or not any([char in productions for char in tail]):
-                new_productions.add_production(head, tail)
+    Args:
+        productions (Dict[int, List[Tail]]): The productions
+        symbols (SymbolTable): The symbols, new variables are added to it
+        show_steps (bool): Print what is done
+    """
+    # One new variable per terminal, shared by all productions
+    terminal_vars: Dict[int, int] = dict()
+    for head in list(productions):
+        tails = productions[head]
+        for i, tail in enumerate(tails):
+            if len(tail) < 2:
                 continue
-            terminals = {char for char in tail if char not in productions}
-            new_tail = tail
-            for terminal in terminals:
-                # Get new variable
-                new_var = gen_new_variabele(variables)
-                # Add nwe variable
-                new_productions.add_production(new_var, terminal)
-                variables.add(new_var)
-                # Replace the terminal in the tail with a variable
-                new_tail = new_tail.replace(terminal, new_var)
-            # Finally add the new tail
-            new_productions.add_production(head, new_tail)
-
-    return CFG(cfg.get_start_state(), new_productions)
+            new_tail = []
+            for symbol in tail:
+                if symbol in productions:
+                    new_tail.append(symbol)
+                    continue
+                if symbol not in terminal_vars:
+                    new_var = symbols.fresh_variable()
+                    terminal_vars[symbol] = new_var
+                    productions[new_var] = [(symbol,)]
+                    if show_steps:
+                        print(f"Adding {symbols.name(new_var)} -> {symbols.name(symbol)}")
+                new_tail.append(terminal_vars[symbol])
+            tails[i] = tuple(new_tail)
+
+
+def enumerate_language(cfg: CFG, max_length: int) -> Iterator[str]:
+    """Lazily yields every terminal string of at most max_length characters
+    that the grammar generates, shortest first and without duplicates.
+    The strings of each length that every variable derives are memoized,
+    and splits where a part can't be derived in the length it gets are
+    pruned using the shortest string each variable derives
+
+    Args:
+        cfg (CFG): The grammar, "!" is the empty string
+        max_length (int): The largest length of a string
+
+    Yields:
+        Iterator[str]: The strings, in sorted order within each length
+    """
+    productions = cfg.get_dict_productions_raw()
+    symbols = cfg.get_symbols()
+    # The tails as lists of symbol names
+    tails = {symbols.name(head): [list(symbols.names(tail)) for tail in head_tails]
+             for head, head_tails in productions.items()}
+    infinity = max_length + 1
+
+    def min_length(symbol: str) -> int:
+        return shortest.get(symbol, infinity) if symbol in tails else len(symbol)
+
+    # The length of the shortest string every variable derives
+    shortest: Dict[str, int] = dict()
+    changed = True
+    while changed:
+        changed = False
+        for head, head_tails in tails.items():
+            for tail in head_tails:
+                length = min(sum(min_length(symbol)
+                             for symbol in tail), infinity)
+                if length < shortest.get(head, infinity):
+                    shortest[head] = length
+                    changed = True
+
+    # derived[variable][length] are the strings of that length it derives
+    derived: Dict[str, List[Set[str]]] = {head: [] for head in tails}
+
+    def expand(tail: List[str], length: int) -> Set[str]:
+        # Minimum length of the symbols from position i to the end
+        rest = [0] * (len(tail) + 1)
+        for i in range(len(tail) - 1, -1, -1):
+            rest[i] = rest[i + 1] + min_length(tail[i])
+
+        results = set()
+
+        def split(i: int, remaining: int, prefix: str) -> None:
+            if i == len(tail):
+                if remaining == 0:
+                    results.add(prefix)
+                return
+            symbol = tail[i]
+            if symbol not in tails:
+                if remaining >= len(symbol) + rest[i + 1]:
+                    split(i + 1, remaining - len(symbol), prefix + symbol)
+                return
+            for part in range(min_length(symbol), remaining - rest[i + 1] + 1):
+                # Copy, the set of the current length may still grow
+                for string in list(derived[symbol][part]):
+                    split(i + 1, remaining - part, prefix + string)
+
+        if rest[0] <= length:
+            split(0, length, "")
+        return results
+
+    start = cfg.get_start_state()
+    for length in range(max_length + 1):
+        for head in derived:
+            derived[head].append(set())
+        # Variables can derive strings of the same length from each
+        # other through empty and unit productions, so iterate until
+        # nothing changes
+        changed = True
+        while changed:
+            changed = False
+            for head, head_tails in tails.items():
+                strings = derived[head][length]
+                size = len(strings)
+                for tail in head_tails:
+                    strings |= expand(tail, length)
+                changed = changed or len(strings) != size
+
+        if start in derived:
+            yield from sorted(derived[start][length])
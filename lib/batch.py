@@ -0,0 +1,80 @@
+"""This module contains vectorized batch operations on DFAs"""
+from typing import Iterable, Tuple
+
+import numpy as np
+
+from lib.compiled_dfa import CompiledDFA
+from lib.dfa import DFA
+
+
+def encode_batch(compiled: CompiledDFA, strings: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Encodes strings to a padded matrix of symbol indices
+
+    Args:
+        compiled (CompiledDFA): The compiled DFA to encode for
+        strings (Iterable[str]): The strings to encode
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: A (strings x max length) matrix of symbol
+        indices and the length of every row. Strings that can't be encoded
+        get the length -1
+    """
+    encoded = [compiled.encode(string) for string in strings]
+    lengths = np.array([-1 if symbols is None else len(symbols)
+                       for symbols in encoded], dtype=np.intp)
+
+    width = max(lengths.max(initial=0), 0)
+    matrix = np.zeros((len(encoded), width), dtype=np.intp)
+    for i, symbols in enumerate(encoded):
+        if symbols:
+            matrix[i, :len(symbols)] = symbols
+    return matrix, lengths
+
+
+def accepts_batch(compiled: CompiledDFA, encoded: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Runs all encoded strings through the DFA in lockstep
+
+    Args:
+        compiled (CompiledDFA): The compiled DFA
+        encoded (np.ndarray): A (strings x max length) matrix of symbol indices
+        lengths (np.ndarray): The length of every row, -1 for rows to reject
+
+    Returns:
+        np.ndarray: A boolean array, True where the string is inside the language
+    """
+    num_states, num_symbols = len(compiled.state_ids), compiled.num_symbols
+    dead = num_states
+
+    # Add a dead row that loops on itself and map missing transitions to it
+    table = np.full((num_states + 1, num_symbols), dead, dtype=np.intp)
+    flat = np.frombuffer(compiled.table, dtype=f"i{compiled.table.itemsize}").reshape(
+        num_states, num_symbols)
+    table[:num_states] = np.where(flat < 0, dead, flat)
+    finals = np.zeros(num_states + 1, dtype=bool)
+    finals[:num_states] = np.frombuffer(compiled.finals, dtype=np.uint8)
+
+    current = np.full(len(encoded), compiled.initial, dtype=np.intp)
+    current[lengths < 0] = dead
+
+    # One iteration per position, only rows that are still long
+    # enough take a step
+    for position in range(encoded.shape[1]):
+        active = lengths > position
+        current[active] = table[current[active], encoded[active, position]]
+
+    return finals[current]
+
+
+def check_strings(dfa: DFA, strings: Iterable[str]) -> np.ndarray:
+    """Check which strings are inside the language of a DFA
+
+    Args:
+        dfa (DFA): The DFA
+        strings (Iterable[str]): The strings to check
+
+    Returns:
+        np.ndarray: A boolean array, True where the string is inside the language
+    """
+    compiled = dfa.compile()
+    encoded, lengths = encode_batch(compiled, strings)
+    return accepts_batch(compiled, encoded, lengths)
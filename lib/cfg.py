@@ -1,71 +1,155 @@
-
-import copy
 import collections
-from typing import Dict, ItemsView, Iterator, List, Set
+from typing import Dict, ItemsView, Iterator, List, Optional, Set
+
+from lib.symbols import SymbolTable, Tail
 
 
 class Productions:
-    def __init__(self) -> None:
-        self._productions: Dict[str, List[str]]
+    """The productions of a grammar. Heads and tails are stored as symbol
+    ids from a SymbolTable, so symbols can have names of any length.
+
+    The productions are copy on write. copy() shares the dict, the lists
+    of tails and the symbol table with the copy, and the first change to
+    a head copies the dict and only the tails of that head. The symbol
+    table is copied the first time a copy adds symbols to it.
+    """
+
+    def __init__(self, symbols: Optional[SymbolTable] = None) -> None:
+        self.symbols = SymbolTable() if symbols is None else symbols
+        self._productions: Dict[int, List[Tail]]
         self._productions = dict()
+        # True if the dict may be shared with a copy
+        self._shared = False
+        # The heads whose lists of tails aren't shared with a copy
+        self._owned: Set[int] = set()
+        # True if the symbol table may be shared with a copy
+        self._symbols_shared = False
+
+    def copy(self) -> "Productions":
+        p = Productions(self.symbols)
+        p._productions = self._productions
+        p._shared = self._shared = True
+        p._symbols_shared = self._symbols_shared = True
+        self._owned = set()
+        return p
+
+    def writable_symbols(self) -> SymbolTable:
+        """Returns the symbol table so symbols can be added to it, it is
+        copied first if it is shared with a copy"""
+        if self._symbols_shared:
+            self.symbols = self.symbols.copy()
+            self._symbols_shared = False
+        return self.symbols
+
+    def _writable_dict(self) -> Dict[int, List[Tail]]:
+        if self._shared:
+            self._productions = dict(self._productions)
+            self._shared = False
+        return self._productions
+
+    def _writable_tails(self, head: int) -> List[Tail]:
+        productions = self._writable_dict()
+        if head not in self._owned:
+            productions[head] = list(productions[head])
+            self._owned.add(head)
+        return productions[head]
 
     def add_production(self, head: str, tail: str) -> None:
         # Variables have to have big letters
         for h in head:
-            if not h.isupper():
+            if not h.isupper() and not h.isdigit():
                 raise ValueError("Lowercase letter in head")
+        symbols = self.writable_symbols()
+        self.add_production_ids(symbols.add(head, variable=True),
+                                symbols.add_tail(tail))
+
+    def add_production_ids(self, head: int, tail: Tail) -> None:
         if head in self._productions:
-            self._productions[head].append(tail)
+            self._writable_tails(head).append(tail)
         else:
-            self._productions[head] = [tail]
+            self._writable_dict()[head] = [tail]
+            self._owned.add(head)
 
     def set_productions(self, productions: Dict[str, List[str]]):
-        self._productions = productions
+        self._productions = dict()
+        self._shared = False
+        self._owned = set()
+        # Know all variables first, so a tail like S1 isn't split into S and 1
+        symbols = self.writable_symbols()
+        for head in productions:
+            symbols.add(head, variable=True)
+        for head, tails in productions.items():
+            for tail in tails:
+                self.add_production(head, tail)
 
     def get_dict_productions(self) -> Dict[str, List[str]]:
-        return copy.deepcopy(self._productions)
-
-    def get_dict_productions_raw(self) -> Dict[str, List[str]]:
+        """Returns a copy of the productions with the names of the symbols"""
+        name, format_tail = self.symbols.name, self.symbols.format_tail
+        return {name(head): [format_tail(tail) for tail in tails]
+                for head, tails in self._productions.items()}
+
+    def get_dict_productions_raw(self) -> Dict[int, List[Tail]]:
+        """Returns the productions as symbol ids without copying them, they
+        may be shared with copies so they must not be changed"""
         return self._productions
 
+    def get_dict_productions_writable(self) -> Dict[int, List[Tail]]:
+        """Returns the productions as symbol ids so they can be changed in
+        place. Only the lists that are shared with a copy are copied. The
+        dict may not be changed anymore after the next call to copy()"""
+        productions = self._writable_dict()
+        for head in productions.keys() - self._owned:
+            productions[head] = list(productions[head])
+        self._owned = set(productions)
+        return productions
+
     def items(self) -> ItemsView[str, List[str]]:
-        return self._productions.items()
+        # By name like __iter__, get_dict_productions_raw has the ids
+        return self.get_dict_productions().items()
 
     def remove_production(self, head: str, tail: str) -> None:
-        self._productions[head].remove(tail)
-        if len(self._productions[head]) == 0:
-            del self._productions[head]
+        head_id = self.symbols.get(head)
+        if head_id not in self._productions:
+            raise ValueError(f"{head} has no productions")
+        tails = self._writable_tails(head_id)
+        tails.remove(tuple(self.symbols.get(name) for name in self.symbols.split_tail(tail)))
+        if len(tails) == 0:
+            del self._productions[head_id]
+            self._owned.discard(head_id)
 
     def remove_unreachable_productions(self, reachable: Set[str] = set()) -> None:
+        keep = {self.symbols.get(name) for name in reachable}
         for _, tails in self._productions.items():
-            reachable = reachable.union({char for tail in tails for char in tail})
+            for tail in tails:
+                keep.update(tail)
 
-        reachable = reachable.intersection({head for head in self._productions})
-        remove = set()
-        for head in self._productions:
-            if head not in reachable:
-                remove.add(head)
-        for head in remove:
-            del self._productions[head]
+        remove = self._productions.keys() - keep
+        if remove:
+            productions = self._writable_dict()
+            for head in remove:
+                del productions[head]
+                self._owned.discard(head)
+
+    def __contains__(self, head: object) -> bool:
+        return self.symbols.get(head) in self._productions
 
     def __iter__(self) -> Iterator[str]:
-        return self._productions.__iter__()
+        return (self.symbols.name(head) for head in self._productions)
 
     def __repr__(self) -> str:
-        stringy = ""
-        for head, tail in self._productions.items():
-            stringy += head+" -> "
-            for i, t in enumerate(tail):
-                stringy += t+" | "
-                if i == len(tail)-1:
-                    stringy = stringy[:-3]+"\n"
-
-        return stringy[:-1]
+        return "\n".join(head + " -> " + " | ".join(tails)
+                         for head, tails in self.get_dict_productions().items())
 
     def __eq__(self, o: object) -> bool:
-        other_dicts = o.get_dict_productions()
+        # The symbol tables can differ so compare the names
+        other_symbols = o.symbols
+        other_dicts = o.get_dict_productions_raw()
         for head, tails in self._productions.items():
-            if collections.Counter(tails) != collections.Counter(other_dicts[head]):
+            other_head = other_symbols.get(self.symbols.name(head))
+            if other_head not in other_dicts:
+                return False
+            if (collections.Counter(map(self.symbols.names, tails))
+                    != collections.Counter(map(other_symbols.names, other_dicts[other_head]))):
                 return False
         return True
 
@@ -81,16 +165,17 @@ class CFG:
             self._variables.add(head)
 
     def get_productions(self) -> Productions:
-        p = Productions()
-        p.set_productions(self._productions.get_dict_productions())
-        return p
+        return self._productions.copy()
 
     def get_start_state(self) -> str:
         return self._start_state
 
-    def get_dict_productions_raw(self) -> Dict[str, List[str]]:
+    def get_dict_productions_raw(self) -> Dict[int, List[Tail]]:
         return self._productions.get_dict_productions_raw()
 
+    def get_symbols(self) -> SymbolTable:
+        return self._productions.symbols
+
     def remove_unreachable_productions(self) -> None:
         self._productions.remove_unreachable_productions({self._start_state})
 
@@ -107,4 +192,5 @@ class CFG:
         return str(self._productions)
 
     def __eq__(self, o: object) -> bool:
-        return self._productions == o.get_productions() and self._start_state == o.get_start_state()
+        # Not get_productions(), a copy would make o copy on its next write
+        return self._productions == o._productions and self._start_state == o.get_start_state()
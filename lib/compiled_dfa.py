@@ -0,0 +1,118 @@
+"""Module containing the CompiledDFA class"""
+from array import array
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+
+if TYPE_CHECKING:
+    from lib.dfa import DFA
+
+# Index used in the transition table for missing transitions
+DEAD = -1
+
+
+class CompiledDFA:
+    """A DFA compiled to a dense state x symbol transition table.
+
+    States and symbols are mapped to contiguous ints so that stepping
+    the automaton is a single index into a flat array.
+    """
+
+    def __init__(self, dfa: "DFA") -> None:
+        # Use the state indices of the automaton
+        self.state_ids: List[int] = dfa._ids
+        self.state_index: Dict[int, int] = dfa._index
+        # Share the symbol indices of the tokenizer
+        self.symbol_trie = dfa.symbol_trie
+        self.symbols: List[str] = self.symbol_trie.symbols
+        self.symbol_index: Dict[str, int] = self.symbol_trie.symbol_index
+        self.num_symbols = len(self.symbols)
+
+        self.initial = dfa._initial
+        self.finals = bytearray(dfa._finals)
+
+        # table[state * num_symbols + symbol] is the next state
+        self.table = array("l", [DEAD]) * \
+            (len(self.state_ids) * self.num_symbols)
+        # Transitions on the empty string can never be taken
+        label_symbols = [self.symbol_index.get(string) for string in dfa._labels]
+        offsets, edge_labels, targets = dfa._offsets, dfa._edge_labels, dfa._targets
+        for state in range(len(self.state_ids)):
+            for edge in range(offsets[state], offsets[state + 1]):
+                symbol = label_symbols[edge_labels[edge]]
+                if symbol is None:
+                    continue
+                row = state * self.num_symbols + symbol
+                # The destinations are sorted, keep the first one
+                if self.table[row] == DEAD:
+                    self.table[row] = targets[edge]
+
+    def step(self, state: int, symbol: int) -> int:
+        """Take a single transition
+
+        Args:
+            state (int): The index of the current state
+            symbol (int): The index of the symbol
+
+        Returns:
+            int: The index of the next state or DEAD
+        """
+        if state == DEAD:
+            return DEAD
+        return self.table[state * self.num_symbols + symbol]
+
+    def encode(self, string: str) -> Optional[List[int]]:
+        """Encodes a string to a list of symbol indices
+
+        Args:
+            string (str): The string to encode
+
+        Returns:
+            Optional[List[int]]: The symbol indices or None if the string
+            contains something that is not in the alphabet
+        """
+        return self.symbol_trie.tokenize(string, indices=True)
+
+    def run(self, symbols: Iterable[int], state: Optional[int] = None) -> int:
+        """Runs the automaton over a sequence of symbol indices
+
+        Args:
+            symbols (Iterable[int]): The symbol indices
+            state (Optional[int], optional): The state to start in. Defaults to the initial state.
+
+        Returns:
+            int: The index of the state the automaton ended in or DEAD
+        """
+        table, width = self.table, self.num_symbols
+        if state is None:
+            state = self.initial
+
+        for symbol in symbols:
+            state = table[state * width + symbol]
+            if state == DEAD:
+                return DEAD
+        return state
+
+    def accepts_symbols(self, symbols: Iterable[int]) -> bool:
+        """Check if a sequence of symbol indices is inside the language
+
+        Args:
+            symbols (Iterable[int]): The symbol indices
+
+        Returns:
+            bool: True if the sequence is inside the language
+        """
+        state = self.run(symbols)
+        return state != DEAD and bool(self.finals[state])
+
+    def accepts(self, string: str) -> bool:
+        """Check if a string is inside the language
+
+        Args:
+            string (str): The string to check
+
+        Returns:
+            bool: True if the string is inside the language
+        """
+        symbols = self.encode(string)
+        if symbols is None:
+            return False
+        return self.accepts_symbols(symbols)
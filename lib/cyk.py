@@ -0,0 +1,161 @@
+"""Module containing the CYKParser class"""
+from typing import Dict, List, Tuple
+
+from lib.cfg import CFG
+
+# The number of bits that are looked up at a time
+CHUNK = 8
+CHUNK_MASK = (1 << CHUNK) - 1
+
+
+def _chunk_tables(masks: List[int]) -> List[List[int]]:
+    """Builds lookup tables for ORing masks[i] for every bit i in a mask
+    one chunk at a time
+
+    Args:
+        masks (List[int]): The mask of every bit position
+
+    Returns:
+        List[List[int]]: tables[chunk][bits] is the OR of the masks of the
+        bits set in bits, counting from bit chunk * CHUNK
+    """
+    tables = []
+    for start in range(0, len(masks), CHUNK):
+        chunk = masks[start:start + CHUNK]
+        table = [0] * (1 << CHUNK)
+        for bits in range(1, 1 << CHUNK):
+            low = bits & -bits
+            position = low.bit_length() - 1
+            table[bits] = table[bits ^ low] | (
+                chunk[position] if position < len(chunk) else 0)
+        tables.append(table)
+    return tables
+
+
+def _lookup(tables: List[List[int]], mask: int) -> int:
+    """ORs the masks of all bits set in mask using chunk tables"""
+    result, chunk = 0, 0
+    while mask:
+        bits = mask & CHUNK_MASK
+        if bits:
+            result |= tables[chunk][bits]
+        mask >>= CHUNK
+        chunk += 1
+    return result
+
+
+class CYKParser:
+    """Tests membership in the language of a grammar in Chomsky normal form
+    with the CYK algorithm. Every cell of the table is an int bitmask over
+    the variables and the binary productions are looked up in tables keyed
+    by chunks of the masks of the left and right cell, so combining two
+    cells is a handful of bitwise operations.
+    """
+
+    def __init__(self, cfg: CFG) -> None:
+        productions = cfg.get_dict_productions_raw()
+        symbols = cfg.get_symbols()
+        self.variables: List[str] = sorted(map(symbols.name, productions))
+        self.variable_index: Dict[str, int] = {
+            variable: i for i, variable in enumerate(self.variables)}
+        self.start = cfg.get_start_state()
+        self.nullable = False
+        # Terminals can have more than one character
+        self.longest_terminal = 1
+
+        # terminals[a] is the mask of the variables A with A -> a
+        self.terminals: Dict[str, int] = dict()
+        binary: List[Tuple[int, int, int]] = []
+        for head, tails in productions.items():
+            head_bit = 1 << self.variable_index[symbols.name(head)]
+            for tail in tails:
+                names = symbols.names(tail)
+                if not tail and symbols.name(head) == self.start:
+                    self.nullable = True
+                elif len(tail) == 1 and tail[0] not in productions:
+                    self.terminals[names[0]] = self.terminals.get(names[0], 0) | head_bit
+                    self.longest_terminal = max(self.longest_terminal, len(names[0]))
+                elif len(tail) == 2 and all(symbol in productions for symbol in tail):
+                    binary.append((head_bit, self.variable_index[names[0]],
+                                   self.variable_index[names[1]]))
+                else:
+                    raise ValueError(f"{symbols.name(head)} -> {symbols.format_tail(tail)} "
+                                     "is not in Chomsky normal form")
+
+        # Masks over the binary productions, by the variable on the
+        # left and on the right, and the heads by production
+        left = [0] * len(self.variables)
+        right = [0] * len(self.variables)
+        for i, (_, b, c) in enumerate(binary):
+            left[b] |= 1 << i
+            right[c] |= 1 << i
+        self._left = _chunk_tables(left)
+        self._right = _chunk_tables(right)
+        self._heads = _chunk_tables([head for head, _, _ in binary])
+
+    def combine(self, left: int, right: int) -> int:
+        """Returns the variables A with A -> BC where B is in left and C in right
+
+        Args:
+            left (int): The mask of the variables of the left part
+            right (int): The mask of the variables of the right part
+
+        Returns:
+            int: The mask of the variables
+        """
+        productions = _lookup(self._left, left)
+        if productions:
+            productions &= _lookup(self._right, right)
+        return _lookup(self._heads, productions) if productions else 0
+
+    def check_string_in_language(self, string: str) -> bool:
+        """Check if a string is inside the language of the grammar
+
+        Args:
+            string (str): The string to check, terminals with more than one
+                character are matched at every position they occur at
+
+        Returns:
+            bool: True if the string is inside the language
+        """
+        length = len(string)
+        if length == 0:
+            return self.nullable
+
+        # starts[i][size - 1] is the mask of the variables that derive
+        # string[i:i + size] and ends[j][size - 1] of string[j - size:j]
+        first = [self.terminals.get(char, 0) for char in string]
+        # The masks of the terminals with more than one character by
+        # start and size
+        spans: Dict[Tuple[int, int], int] = dict()
+        if self.longest_terminal == 1:
+            if not all(first):
+                return False
+        else:
+            for terminal, mask in self.terminals.items():
+                if len(terminal) == 1:
+                    continue
+                i = string.find(terminal)
+                while i != -1:
+                    spans[(i, len(terminal))] = spans.get((i, len(terminal)), 0) | mask
+                    i = string.find(terminal, i + 1)
+        starts = [[mask] for mask in first]
+        ends = [[]] + [[mask] for mask in first]
+
+        combine = self.combine
+        # The same pairs of cells show up over and over
+        combined: Dict[Tuple[int, int], int] = dict()
+        for size in range(2, length + 1):
+            for i in range(length - size + 1):
+                cell = spans.get((i, size), 0) if spans else 0
+                # Split into string[i:i + k] and string[i + k:i + size]
+                for left, right in zip(starts[i], reversed(ends[i + size])):
+                    if left and right:
+                        result = combined.get((left, right))
+                        if result is None:
+                            result = combined[(left, right)] = combine(left, right)
+                        cell |= result
+                starts[i].append(cell)
+                ends[i + size].append(cell)
+
+        return bool(starts[0][length - 1] >> self.variable_index[self.start] & 1)
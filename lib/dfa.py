@@ -1,8 +1,10 @@
 """Module containing the DFA class"""
-
+import time
 from typing import Optional
 
+from lib import instrumentation
 from lib.automaton import Automaton
+from lib.compiled_dfa import DEAD, CompiledDFA
 from lib.state import State
 from lib.transition import Transition
 
@@ -10,11 +12,26 @@ from lib.transition import Transition
 class DFA(Automaton):
     """Class represeting an NFA"""
 
+    def _setup(self) -> None:
+        super()._setup()
+        self._compiled: Optional[CompiledDFA] = None
+
     def get_transition(self, state_id: int, symbol: str) -> Optional[State]:
         state = super().get_transition(state_id, symbol)
         if state is None:
             return None
-        return state.copy().pop()
+        return next(iter(state))
+
+    def compile(self) -> CompiledDFA:
+        """Compiles the DFA to a dense integer-indexed transition table.
+        The result is cached, so this is cheap to call repeatedly
+
+        Returns:
+            CompiledDFA: The compiled DFA
+        """
+        if self._compiled is None:
+            self._compiled = CompiledDFA(self)
+        return self._compiled
 
     def check_string_in_language(self, string: str) -> bool:
         """Check if a string is inside the language this DFA
@@ -25,16 +42,56 @@ class DFA(Automaton):
         Returns:
             bool: True if the string is inside the language
         """
-        symbols = super()._get_symbols(string)
-        current_state = self.initial_state
+        compiled = self.compile()
+        if not instrumentation.ENABLED:
+            return compiled.accepts(string)
+
+        instrumentation.count("dfa.strings")
+        start = time.perf_counter()
+        symbols = compiled.encode(string)
+        instrumentation.add_time("automaton.tokenize", time.perf_counter() - start)
+        if symbols is None:
+            return False
+        instrumentation.count("automaton.symbols", len(symbols))
+        state = compiled.run(symbols)
+        return state != DEAD and bool(compiled.finals[state])
+
+    def initial_configuration(self) -> int:
+        """Returns the index of the initial state in the compiled DFA
+
+        Returns:
+            int: The initial configuration
+        """
+        return self.compile().initial
 
-        # Calculate for all steps
-        for symbol in symbols:
-            current_state = self.get_transition(current_state.id, symbol)
-            if current_state is None:
-                return False
+    def next_configuration(self, configuration: int, symbol: str) -> int:
+        """Takes a transition in the compiled DFA
 
-        return current_state.final
+        Args:
+            configuration (int): The index of the current state
+            symbol (str): The symbol to read
+
+        Returns:
+            int: The index of the next state or DEAD
+        """
+        compiled = self.compile()
+        if instrumentation.ENABLED:
+            instrumentation.count("dfa.transitions")
+        index = compiled.symbol_index.get(symbol)
+        if index is None:
+            return DEAD
+        return compiled.step(configuration, index)
+
+    def is_accepting(self, configuration: int) -> bool:
+        """Check if a state of the compiled DFA is final
+
+        Args:
+            configuration (int): The index of the state
+
+        Returns:
+            bool: True if the state is final
+        """
+        return configuration != DEAD and bool(self.compile().finals[configuration])
 
     def check_complete(self) -> bool:
         """Check that the DFA does not have missing transitions
@@ -42,9 +99,7 @@ class DFA(Automaton):
         Returns:
             bool: True if the DFA has no missing transitions
         """
-        for state in self.states:
-            for symbol in self.alphabet:
-                if self.get_transition(state, symbol) is None:
-                    return False
-
-        return True
+        # Every state needs a transition on every string in the alphabet
+        width = len(self._labels)
+        return all(sum(1 for _ in self._state_labels(state)) == width
+                   for state in range(len(self._ids)))
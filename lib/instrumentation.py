@@ -0,0 +1,198 @@
+"""This module contains opt-in counters and timers for the automatons
+
+Instrumentation is off by default. Call sites check ENABLED before
+recording anything, so when it is off the cost is one attribute lookup:
+
+    if instrumentation.ENABLED:
+        instrumentation.count("nfa.e_closures")
+
+Use enable() or the enabled() context manager to turn it on, stats() to
+read what was recorded and profile() to run cProfile around one call.
+"""
+import cProfile
+import functools
+import io
+import pstats
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, TypeVar
+
+ENABLED = False
+
+_counters: Counter = Counter()
+# The number of calls and the total seconds of every timer
+_timers: Dict[str, List[float]] = dict()
+
+F = TypeVar("F", bound=Callable)
+
+
+class TimerStats(NamedTuple):
+    """The calls and total time of a timer"""
+    calls: int
+    seconds: float
+
+
+class Stats(NamedTuple):
+    """A snapshot of the counters and timers"""
+    counters: Dict[str, int]
+    timers: Dict[str, TimerStats]
+
+
+def enable() -> None:
+    global ENABLED
+    ENABLED = True
+
+
+def disable() -> None:
+    global ENABLED
+    ENABLED = False
+
+
+@contextmanager
+def enabled() -> Iterator[None]:
+    """Turns instrumentation on inside a with block"""
+    global ENABLED
+    previous, ENABLED = ENABLED, True
+    try:
+        yield
+    finally:
+        ENABLED = previous
+
+
+def count(name: str, amount: int = 1) -> None:
+    """Adds to a counter, callers check ENABLED first
+
+    Args:
+        name (str): The name of the counter
+        amount (int, optional): The amount to add. Defaults to 1.
+    """
+    _counters[name] += amount
+
+
+def add_time(name: str, seconds: float) -> None:
+    """Records one call of a timer, callers check ENABLED first
+
+    Args:
+        name (str): The name of the timer
+        seconds (float): The time the call took
+    """
+    timer = _timers.get(name)
+    if timer is None:
+        _timers[name] = [1, seconds]
+    else:
+        timer[0] += 1
+        timer[1] += seconds
+
+
+@contextmanager
+def timer(name: str) -> Iterator[None]:
+    """Times a with block if instrumentation is on
+
+    Args:
+        name (str): The name of the timer
+    """
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_time(name, time.perf_counter() - start)
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Decorator that times every call of a function if instrumentation is on
+
+    Args:
+        name (str): The name of the timer
+    """
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                add_time(name, time.perf_counter() - start)
+        return wrapper  # type: ignore
+    return decorator
+
+
+def stats(reset: bool = False) -> Stats:
+    """Returns a snapshot of the counters and timers
+
+    Args:
+        reset (bool, optional): Reset them after taking the snapshot. Defaults to False.
+
+    Returns:
+        Stats: The snapshot
+    """
+    snapshot = Stats(dict(_counters),
+                     {name: TimerStats(int(calls), seconds)
+                      for name, (calls, seconds) in _timers.items()})
+    if reset:
+        reset_stats()
+    return snapshot
+
+
+def reset_stats() -> None:
+    """Sets all counters and timers back to zero"""
+    _counters.clear()
+    _timers.clear()
+
+
+class Profile:
+    """The result of profile(), filled in when the with block ends"""
+
+    def __init__(self) -> None:
+        self.profiler = cProfile.Profile()
+        self.pstats: Optional[pstats.Stats] = None
+        self.stats: Optional[Stats] = None
+
+    def report(self, sort: str = "cumulative", limit: int = 20) -> str:
+        """Formats the profile
+
+        Args:
+            sort (str, optional): The pstats sort key. Defaults to "cumulative".
+            limit (int, optional): The number of functions to show. Defaults to 20.
+
+        Returns:
+            str: The report
+        """
+        stream = io.StringIO()
+        pstats.Stats(self.profiler, stream=stream).sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+
+@contextmanager
+def profile() -> Iterator[Profile]:
+    """Runs cProfile and the counters and timers for a with block, for
+    example around a single call:
+
+        with profile() as p:
+            nfa.check_string_in_language(string)
+        print(p.stats.counters)
+        print(p.report())
+
+    Only what happens inside the block ends up in p.stats, the global
+    counters and timers are left as they were.
+
+    Yields:
+        Iterator[Profile]: The profile
+    """
+    global ENABLED, _counters, _timers
+    result = Profile()
+    saved = (ENABLED, _counters, _timers)
+    ENABLED, _counters, _timers = True, Counter(), dict()
+    result.profiler.enable()
+    try:
+        yield result
+    finally:
+        result.profiler.disable()
+        result.stats = stats()
+        ENABLED, _counters, _timers = saved
+        result.pstats = pstats.Stats(result.profiler)
@@ -0,0 +1,113 @@
+"""Module containing the LazyDFA class"""
+from typing import TYPE_CHECKING, Dict, FrozenSet, List
+
+if TYPE_CHECKING:
+    from lib.nfa import NFA
+
+# Marks a successor that hasn't been computed yet
+UNKNOWN = -1
+
+
+class LazyDFA:
+    """Matches strings against an NFA by determinizing it on the fly.
+
+    Every DFA state is an e closed set of NFA states. The successor of a
+    (state, symbol) pair is computed the first time it is needed and
+    then memoized. When more than max_states states have been built the
+    whole cache is flushed and building starts over, which keeps the
+    memory bounded for NFAs whose full subset construction blows up.
+    """
+
+    def __init__(self, nfa: "NFA", max_states: int = 10000) -> None:
+        if max_states < 2:
+            raise ValueError("max_states has to be at least 2")
+        self.nfa = nfa
+        self.max_states = max_states
+        self.flushes = 0
+
+        # The symbols a step on each symbol index has to take
+        self._steps: List[List[str]] = [
+            [symbol] + nfa.nfa_transition_table.get(symbol, [])
+            for symbol in nfa.symbol_trie.symbols]
+        self._initial_set = nfa.initial_configuration()
+
+        self._sets: List[FrozenSet[int]] = []
+        self._index: Dict[FrozenSet[int], int] = dict()
+        self._finals: List[bool] = []
+        self._successors: List[List[int]] = []
+        self.initial = self._add(self._initial_set)
+
+    @property
+    def num_states(self) -> int:
+        """The number of DFA states currently in the cache"""
+        return len(self._sets)
+
+    def _add(self, ids: FrozenSet[int]) -> int:
+        """Adds a new DFA state
+
+        Args:
+            ids (FrozenSet[int]): The indices of the NFA states in the DFA state
+
+        Returns:
+            int: The index of the new DFA state
+        """
+        index = len(self._sets)
+        self._sets.append(ids)
+        self._index[ids] = index
+        self._finals.append(self.nfa.is_accepting(ids))
+        self._successors.append([UNKNOWN] * len(self._steps))
+        return index
+
+    def _flush(self) -> None:
+        """Throws away all DFA states except the initial one"""
+        self.flushes += 1
+        self._sets, self._index = [], dict()
+        self._finals, self._successors = [], []
+        self.initial = self._add(self._initial_set)
+
+    def next_state(self, state: int, symbol: int) -> int:
+        """Returns the successor of a DFA state, building it if needed.
+        This may flush the cache, so indices of other states should not
+        be kept around across calls.
+
+        Args:
+            state (int): The index of the DFA state
+            symbol (int): The index of the symbol
+
+        Returns:
+            int: The index of the next DFA state
+        """
+        successor = self._successors[state][symbol]
+        if successor != UNKNOWN:
+            return successor
+
+        ids = self.nfa._step(self._sets[state], self._steps[symbol])
+        successor = self._index.get(ids)
+        if successor is None:
+            if len(self._sets) >= self.max_states:
+                # Only the initial state survives a flush
+                self._flush()
+                return self.initial if ids == self._initial_set else self._add(ids)
+            successor = self._add(ids)
+        self._successors[state][symbol] = successor
+        return successor
+
+    def check_string_in_language(self, string: str) -> bool:
+        """Check if a string is inside the language of the NFA
+
+        Args:
+            string (str): The string to check
+
+        Returns:
+            bool: True if the string is inside the language
+        """
+        symbols = self.nfa.symbol_trie.tokenize(string, indices=True)
+        if symbols is None:
+            return False
+
+        state = self.initial
+        for symbol in symbols:
+            state = self.next_state(state, symbol)
+            if not self._sets[state]:
+                return False
+        return self._finals[state]
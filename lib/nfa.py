@@ -1,22 +1,54 @@
 """Module containing the NFA class"""
-from typing import Dict, Iterable, List, Set
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set
 
+from lib import instrumentation
 from lib.automaton import Automaton
+from lib.lazy_dfa import LazyDFA
 from lib.state import State
 from lib.transition import Transition
 
 
+class ClosureCacheInfo(NamedTuple):
+    """Statistics of the e closure cache of an NFA"""
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
 class NFA(Automaton):
     """Class represeting an NFA"""
 
-    def __init__(self, states: Set[State], transitions: Dict[Transition, List[int]]) -> None:
+    # The number of e closures of sets of states to cache
+    closure_cache_size = 4096
+
+    def __init__(self, states: Set[State], transitions: Dict[Transition, List[int]],
+                 closure_cache_size: int = 4096) -> None:
+        self.closure_cache_size = closure_cache_size
         super().__init__(states, transitions)
+
+    def _setup(self) -> None:
+        super()._setup()
         self.nfa_transition_table: Dict[str, List[str]]
         self.nfa_transition_table = dict()
 
         # Build an NFA table
         self._build_nfa_symbol_steps()
 
+        # The e closure of every state, by state index
+        self._state_closures: List[FrozenSet[int]] = []
+        self._build_state_closures()
+
+        # LRU cache of e closures of sets of states
+        self._closure_cache: "OrderedDict[FrozenSet[int], FrozenSet[int]]"
+        self._closure_cache = OrderedDict()
+        self.closure_cache_hits = 0
+        self.closure_cache_misses = 0
+
+        self._lazy_dfa: Optional[LazyDFA] = None
+
     # todo this should be on transition to transitions instead of str to strs
     def _build_nfa_symbol_steps(self) -> None:
         """Build an "nfa transition table" where if
@@ -44,9 +76,56 @@ class NFA(Automaton):
                     else:
                         self.nfa_transition_table[symbol] = [symbols[j]]
 
-    # todo This e_closure gets called very often if checking if a string is
-    # in the language, thus it would be much better to cache the e_closure of
-    # all sets
+    def _build_state_closures(self) -> None:
+        """Precompute the e closure of every single state"""
+        epsilon = self._label_index.get("")
+        for index in range(len(self._ids)):
+            closure = {index}
+            stack = [index]
+            while stack and epsilon is not None:
+                for dest in self._dests(stack.pop(), epsilon):
+                    if dest not in closure:
+                        closure.add(dest)
+                        stack.append(dest)
+            self._state_closures.append(frozenset(closure))
+
+    def _closure(self, indices: FrozenSet[int]) -> FrozenSet[int]:
+        """Calculates the e closure of some states using the cache
+
+        Args:
+            indices (FrozenSet[int]): The indices of the states
+
+        Returns:
+            FrozenSet[int]: The indices of the states in the e closure
+        """
+        cache = self._closure_cache
+        closure = cache.get(indices)
+        if closure is not None:
+            self.closure_cache_hits += 1
+            if instrumentation.ENABLED:
+                instrumentation.count("nfa.e_closure_cache_hits")
+            cache.move_to_end(indices)
+            return closure
+
+        self.closure_cache_misses += 1
+        if instrumentation.ENABLED:
+            instrumentation.count("nfa.e_closures")
+        closure = frozenset().union(
+            *[self._state_closures[index] for index in indices])
+        cache[indices] = closure
+        if len(cache) > self.closure_cache_size:
+            cache.popitem(last=False)
+        return closure
+
+    def closure_cache_info(self) -> ClosureCacheInfo:
+        """Returns statistics about the e closure cache
+
+        Returns:
+            ClosureCacheInfo: The hits, misses, maximum and current size of the cache
+        """
+        return ClosureCacheInfo(self.closure_cache_hits, self.closure_cache_misses,
+                                self.closure_cache_size, len(self._closure_cache))
+
     def calculate_e_closure(self, ids: Iterable[int]) -> Set[State]:
         """Calculates the e closure of some states
 
@@ -56,39 +135,95 @@ class NFA(Automaton):
         Returns:
             Set[State]: The e closure
         """
-        # This could be used, but slows it down a bit
-        # super()._check_ids(ids)
-
-        # Just a stack of states that we've already checked
-        seen = set()
-        # Set of states in e closure
-        e_closure = set(self.states[id] for id in ids)
-
-        stack = [id for id in ids]
-        while stack:
-            _id = stack.pop()
-            if _id in seen:
-                continue
-            seen.add(_id)
-
-            for transition, dests in self.transitions.items():
-                # If it has the same origin and it transitions on the empty string
-                if transition.origin == _id and transition.string == "":
-                    stack.extend([dest.id for dest in dests])
-                    e_closure = e_closure | dests
-
-        return e_closure
-
-    def _get_symbols(self, string: str) -> List[List[str]]:
+        indices = frozenset(self._index[_id] for _id in ids)
+        return {self._state(index) for index in self._closure(indices)}
+
+    def _step(self, indices: FrozenSet[int], symbols: List[str]) -> FrozenSet[int]:
+        """Takes one step from an e closed set of states
+
+        Args:
+            indices (FrozenSet[int]): The indices of the e closed set of states
+            symbols (List[str]): The symbols of the step
+
+        Returns:
+            FrozenSet[int]: The indices of the e closure of the next states
+        """
+        labels = [self._label_index[symbol]
+                  for symbol in symbols if symbol in self._label_index]
+        offsets, edge_labels, targets = self._offsets, self._edge_labels, self._targets
+        if instrumentation.ENABLED:
+            instrumentation.count("nfa.steps")
+            instrumentation.count("nfa.step_states", len(indices))
+        next_indices = set()
+        for index in indices:
+            start, end = offsets[index], offsets[index + 1]
+            for label in labels:
+                low = bisect_left(edge_labels, label, start, end)
+                next_indices.update(
+                    targets[low:bisect_right(edge_labels, label, low, end)])
+        return self._closure(frozenset(next_indices))
+
+    def lazy_dfa(self, max_states: int = 10000) -> LazyDFA:
+        """Returns a matcher that determinizes this NFA on the fly.
+        The matcher is kept, so repeated checks reuse the DFA states
+        that were already built
+
+        Args:
+            max_states (int, optional): The number of DFA states to cache before flushing. Defaults to 10000.
+
+        Returns:
+            LazyDFA: The matcher
+        """
+        if self._lazy_dfa is None or self._lazy_dfa.max_states != max_states:
+            self._lazy_dfa = LazyDFA(self, max_states)
+        return self._lazy_dfa
+
+    def initial_configuration(self) -> FrozenSet[int]:
+        """Returns the e closure of the initial state
+
+        Returns:
+            FrozenSet[int]: The indices of the states in the initial configuration
+        """
+        return self._closure(frozenset([self._initial]))
+
+    def next_configuration(self, configuration: FrozenSet[int], symbol: str) -> FrozenSet[int]:
+        """Takes one step on a symbol
+
+        Args:
+            configuration (FrozenSet[int]): The indices of the e closed set of current states
+            symbol (str): The symbol to read
+
+        Returns:
+            FrozenSet[int]: The indices of the e closed set of next states
+        """
+        return self._step(configuration, [symbol] + self.nfa_transition_table.get(symbol, []))
+
+    def is_accepting(self, configuration: FrozenSet[int]) -> bool:
+        """Check if a set of states contains a final state
+
+        Args:
+            configuration (FrozenSet[int]): The indices of the states
+
+        Returns:
+            bool: True if any of the states is final
+        """
+        finals = self._finals
+        return any(finals[index] for index in configuration)
+
+    def _get_symbols(self, string: str) -> Optional[List[List[str]]]:
         """Returns the symbols from a string in the right order
 
         Args:
             string (str): The string to get symbols from
 
         Returns:
-            List[List[str]]: The symbols extracted from the string
+            Optional[List[List[str]]]: The symbols extracted from the string or None
+            if the string contains something that is not in the alphabet
         """
-        steps = [[step] for step in super()._get_symbols(string)]
+        symbols = super()._get_symbols(string)
+        if symbols is None:
+            return None
+        steps = [[step] for step in symbols]
 
         # Get potential additional steps
         # For example if we have a transition on "a", and on "ab",
@@ -108,29 +243,18 @@ class NFA(Automaton):
         Returns:
             bool: True if the string is inside the language
         """
+        if instrumentation.ENABLED:
+            instrumentation.count("nfa.strings")
         steps = self._get_symbols(string)
+        if steps is None:
+            return False
 
-        current_states = {self.initial_state}
-        new_current_states = set()
-        # print(f"========= string is {string} ============")
-        # print("steps is", steps)
+        current = self.initial_configuration()
 
         # Calculate for all steps
         for symbols in steps:
-            # Calculate for each symbol in the symbols
-            for symbol in symbols:
-                # Get the e closure of the current state
-                new_states = self.calculate_e_closure(
-                    [state.id for state in current_states])
-                for state in new_states:
-                    # Get transitions from state "state.id" on symbol "symbol"
-                    new_states = self.transitions.get(
-                        Transition(state.id, symbol))
-                    if not new_states is None:
-                        new_current_states = new_current_states | new_states
-            current_states = new_current_states
-            new_current_states = set()
-
-        current_states = [state for state in self.calculate_e_closure(
-            [state.id for state in current_states])]
-        return any(state.final for state in current_states)
+            current = self._step(current, symbols)
+            if not current:
+                return False
+
+        return self.is_accepting(current)
@@ -9,6 +9,50 @@ from lib.state import State
 from lib.transition import Transition
 
 
+class JFLAPParseError(ValueError):
+    """Raised when a JFLAP xml file is malformed"""
+
+
+def _parse_state(state: ET.Element) -> State:
+    """Parses a state element of a JFLAP xml document
+
+    Args:
+        state (ET.Element): The state element
+
+    Returns:
+        State: The state
+    """
+    try:
+        identifier = int(str(state.get("id")))
+    except ValueError as e:
+        raise JFLAPParseError(f"State has an invalid id: {e}") from e
+    return State(id=identifier, name=str(state.get("name")),
+                 initial=state.find("initial") is not None,
+                 final=state.find("final") is not None)
+
+
+def _parse_transition(trans: ET.Element) -> Tuple[Transition, int]:
+    """Parses a transition element of a JFLAP xml document
+
+    Args:
+        trans (ET.Element): The transition element
+
+    Returns:
+        Tuple[Transition, int]: The transition and its destination
+    """
+    orig, dest, read = trans.find("from"), trans.find("to"), trans.find("read")
+    if orig is None or dest is None or orig.text is None or dest.text is None:
+        raise JFLAPParseError("Transition is missing from or to")
+    try:
+        origin, destination = int(orig.text), int(dest.text)
+    except ValueError as e:
+        raise JFLAPParseError(
+            f"Transition has an invalid state id: {e}") from e
+
+    string = "" if read is None or read.text is None else read.text
+    return Transition(origin, str(string)), destination
+
+
 def parse_states(root: ET.Element) -> Set[State]:
     """Parses the JFLAP xml to get a dict of states
 
@@ -18,19 +62,12 @@ def parse_states(root: ET.Element) -> Set[State]:
     Returns:
         Dict[State]: A dict of all states
     """
-    states = set()
+    automaton = root.find("automaton")
+    if automaton is None:
+        raise JFLAPParseError("No automaton found")
 
     # Parse id, name, initial, and final
-    for state in root.findall("automaton")[0].findall("state"):
-        name = str(state.get("name"))
-        identifier = int(str(state.get("id")))
-        initial = len(state.findall("initial")) > 0
-        final = len(state.findall("final")) > 0
-
-        states.add(State(id=identifier, name=name,
-                         initial=initial, final=final))
-
-    return states
+    return {_parse_state(state) for state in automaton.findall("state")}
 
 
 def parse_transitions(root: ET.Element) -> Dict[Transition, List[int]]:
@@ -42,24 +79,17 @@ def parse_transitions(root: ET.Element) -> Dict[Transition, List[int]]:
     Returns:
         Dict[Transition, List[int]]: The dict of transitions
     """
-    transitions_ = dict()
-
-    for trans in root.findall("automaton")[0].findall("transition"):
-        orig = trans.find("from").text
-        dests = trans.find("to").text
-        string = trans.find("read").text
+    automaton = root.find("automaton")
+    if automaton is None:
+        raise JFLAPParseError("No automaton found")
 
-        if orig is None or dests is None:
-            print("Wtf")
-            exit(1)
-        if string is None:
-            string = ""
-
-        k = Transition(int(orig), str(string))
+    transitions_ = dict()
+    for trans in automaton.findall("transition"):
+        k, dest = _parse_transition(trans)
         if k in transitions_:
-            transitions_[k].append(int(dests))
+            transitions_[k].append(dest)
         else:
-            transitions_[k] = [int(dests)]
+            transitions_[k] = [dest]
 
     return transitions_
 
@@ -74,8 +104,57 @@ def parse_jflap_xml(path: str) -> Tuple[Set[State],
     Returns:
         Tuple[Set[State], Dict[Transition, List[int]]]: Tuple of states and transitions
     """
-    root = ET.parse(path).getroot()
-    return (parse_states(root), parse_transitions(root))
+    return iterparse_jflap_xml(path)
+
+
+def iterparse_jflap_xml(path: str) -> Tuple[Set[State],
+                                            Dict[Transition, List[int]]]:
+    """Parses a JFLAP xml file in one streaming pass. Every state and
+    transition is removed from the tree as soon as it has been parsed,
+    so the memory used doesn't grow with the size of the file
+
+    Args:
+        path (str): The path to the JFLAP xml file
+
+    Raises:
+        JFLAPParseError: If the file is malformed
+
+    Returns:
+        Tuple[Set[State], Dict[Transition, List[int]]]: Tuple of states and transitions
+    """
+    states = set()
+    transitions_ = dict()
+
+    # The open elements, only the states and transitions directly in
+    # the first automaton directly in the root are parsed
+    stack: List[ET.Element] = []
+    automaton = None
+    try:
+        for event, elem in ET.iterparse(path, events=("start", "end")):
+            if event == "start":
+                stack.append(elem)
+                if automaton is None and len(stack) == 2 and elem.tag == "automaton":
+                    automaton = elem
+                continue
+
+            stack.pop()
+            if automaton is None or len(stack) != 2 or stack[1] is not automaton:
+                continue
+            if elem.tag == "state":
+                states.add(_parse_state(elem))
+            elif elem.tag == "transition":
+                k, dest = _parse_transition(elem)
+                if k in transitions_:
+                    transitions_[k].append(dest)
+                else:
+                    transitions_[k] = [dest]
+            automaton.remove(elem)
+    except ET.ParseError as e:
+        raise JFLAPParseError(f"Invalid xml in {path}: {e}") from e
+
+    if automaton is None:
+        raise JFLAPParseError("No automaton found")
+    return states, transitions_
 
 
 def parse_jflap_dfa(path: str) -> DFA:
@@ -84,11 +163,17 @@ def parse_jflap_dfa(path: str) -> DFA:
     Args:
         path (str): The path to the JFLAP xml file
 
+    Raises:
+        JFLAPParseError: If the file is malformed or isn't a valid automaton
+
     Returns:
         DFA: The DFA
     """
     states, transitions = parse_jflap_xml(path)
-    return DFA(states, transitions)
+    try:
+        return DFA(states, transitions)
+    except ValueError as e:
+        raise JFLAPParseError(f"{path}: {e}") from e
 
 
 def parse_jflap_nfa(path: str) -> NFA:
@@ -97,49 +182,51 @@ def parse_jflap_nfa(path: str) -> NFA:
     Args:
         path (str): The path to the JFLAP xml file
 
+    Raises:
+        JFLAPParseError: If the file is malformed or isn't a valid automaton
+
     Returns:
         NFA: The NFA
     """
     states, transitions = parse_jflap_xml(path)
-    return NFA(states, transitions)
+    try:
+        return NFA(states, transitions)
+    except ValueError as e:
+        raise JFLAPParseError(f"{path}: {e}") from e
 
 
 def parse_cfg(path: str) -> CFG:
     with open(path) as f:
         lines = f.read().splitlines()
+    return _parse_cfg_lines(lines)
 
+
+def parse_cfg_string(string: str) -> CFG:
+    return _parse_cfg_lines(string.split("\n"))
+
+
+def _parse_cfg_lines(lines: List[str]) -> CFG:
     # Can not contain productions like
     # A -> b
     # A -> c
     # It has to be in the form
     # A -> b | c
-    start = None
-    productions = Productions()
+    # Every character is a symbol, unless the symbols of a tail are
+    # separated by spaces like A -> a B1 b, or the tail is the name of
+    # a variable like A -> B1. A single terminal with more than one
+    # character is written as A -> ab !
+    rules = []
     for line in lines:
         l1 = line.split("->")
-        head = l1[0].strip()
-        for l in l1[1].split("|"):
-            productions.add_production(head, l.strip())
-        if start is None:
-            start = head
-    assert start is not None
-    return CFG(start, productions)
-
+        rules.append((l1[0].strip(), [l.strip() for l in l1[1].split("|")]))
+    assert rules
 
-def parse_cfg_string(string: str) -> CFG:
-    # Can not contain productions like
-    # A -> b
-    # A -> c
-    # It has to be in the form
-    # A -> b | c
-    start = None
     productions = Productions()
-    for line in string.split("\n"):
-        l1 = line.split("->")
-        head = l1[0].strip()
-        for l in l1[1].split("|"):
-            productions.add_production(head, l.strip())
-        if start is None:
-            start = head
-    assert start is not None
-    return CFG(start, productions)
+    # Know all variables first, so a tail like B1 isn't split into B and 1
+    symbols = productions.writable_symbols()
+    for head, _ in rules:
+        symbols.add(head, variable=True)
+    for head, tails in rules:
+        for tail in tails:
+            productions.add_production(head, tail)
+    return CFG(rules[0][0], productions)
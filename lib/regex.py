@@ -0,0 +1,377 @@
+"""This module contains a compiler from regexes to NFAs
+
+Only the subset of Python's regex syntax that describes regular languages
+over single character symbols is supported: literals, ".", character
+classes, concatenation, "|", "*", "+", "?", "{m,n}" and their lazy forms,
+groups and the anchors "^" and "$" at the ends of the top level options.
+A negative lookahead is supported in the form ((?!X).)* right before the
+end of an option, which matches strings where X doesn't occur.
+"""
+import re
+from typing import Dict, FrozenSet, Iterable, List, Optional, Pattern, Tuple
+
+from lib.automaton import Automaton
+from lib.automaton_ops import equivalent, nfa_to_dfa
+from lib.dfa import DFA
+from lib.nfa import NFA
+from lib.state import State
+from lib.transition import Transition
+
+# Nodes of the syntax tree are tuples, where the first item is one of
+# "set" (a frozenset of symbols), "cat" and "alt" (a list of nodes),
+# "star", "plus" and "opt" (a node), "empty" and "avoid" (a node that
+# may not occur in the rest of the string)
+Node = Tuple
+
+CLASS_ESCAPES = {
+    "d": set("0123456789"),
+    "w": set("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_"),
+    "s": set(" \t\n\r\f\v"),
+}
+CONTROL_ESCAPES = {"a": "\a", "f": "\f", "n": "\n", "r": "\r", "t": "\t", "v": "\v"}
+
+
+class _Parser:
+    """Recursive descent parser for the supported regex syntax"""
+
+    def __init__(self, pattern: str, alphabet: FrozenSet[str]) -> None:
+        self.pattern = pattern
+        self.alphabet = alphabet
+        self.position = 0
+        # The number of groups the parser is in
+        self.depth = 0
+
+    def error(self, message: str) -> ValueError:
+        return ValueError(f"{message} at position {self.position} in {self.pattern!r}")
+
+    def peek(self) -> Optional[str]:
+        if self.position < len(self.pattern):
+            return self.pattern[self.position]
+        return None
+
+    def take(self) -> str:
+        char = self.peek()
+        if char is None:
+            raise self.error("Unexpected end of pattern")
+        self.position += 1
+        return char
+
+    def at_end(self) -> bool:
+        """True if the parser is at the end of a top level option,
+        which may end with $"""
+        rest = self.pattern[self.position:]
+        return self.depth == 0 and (rest in ("", "$") or rest.startswith(("|", "$|")))
+
+    def parse(self) -> Node:
+        """Parses the whole pattern. Like re.match, a top level option
+        only has to match at the start of the string unless it ends with $
+
+        Returns:
+            Node: The syntax tree
+        """
+        options = []
+        while True:
+            if self.peek() == "^":
+                self.position += 1
+            node = self.concatenation()
+            if self.peek() == "$":
+                self.position += 1
+                if self.peek() not in (None, "|"):
+                    raise self.error("$ is only supported at the end of an option")
+                if "\n" in self.alphabet:
+                    # Like in re, $ also matches right before a newline at the end
+                    node = ("cat", [node, ("opt", ("set", frozenset("\n")))])
+            else:
+                node = ("cat", [node, ("star", ("set", self.alphabet))])
+            options.append(node)
+            if self.peek() != "|":
+                break
+            self.position += 1
+        if self.peek() is not None:
+            raise self.error("Unexpected character")
+        return options[0] if len(options) == 1 else ("alt", options)
+
+    def alternation(self) -> Node:
+        options = [self.concatenation()]
+        while self.peek() == "|":
+            self.position += 1
+            options.append(self.concatenation())
+        return options[0] if len(options) == 1 else ("alt", options)
+
+    def concatenation(self) -> Node:
+        parts = []
+        while self.peek() not in (None, "|", ")") and not (self.peek() == "$" and self.depth == 0):
+            parts.append(self.repetition())
+        if not parts:
+            return ("empty",)
+        return parts[0] if len(parts) == 1 else ("cat", parts)
+
+    def repetition(self) -> Node:
+        if self.pattern.startswith("((?!", self.position):
+            return self.avoid()
+        node = self.atom()
+        if self.peek() not in ("*", "+", "?", "{"):
+            return node
+        char = self.take()
+        if char == "*":
+            node = ("star", node)
+        elif char == "+":
+            node = ("plus", node)
+        elif char == "?":
+            node = ("opt", node)
+        else:
+            node = self.bounded(node)
+        # Lazy quantifiers match the same strings, only the match differs
+        if self.peek() == "?":
+            self.position += 1
+        if self.peek() in ("*", "+", "?", "{"):
+            raise self.error("Multiple repeat")
+        return node
+
+    def bounded(self, node: Node) -> Node:
+        """Expands node{m}, node{m,} and node{m,n}"""
+        end = self.pattern.find("}", self.position)
+        if end == -1:
+            raise self.error("Unterminated {")
+        bounds = self.pattern[self.position:end].split(",")
+        self.position = end + 1
+        try:
+            # {,n} means {0,n}
+            low = int(bounds[0]) if bounds[0] != "" or len(bounds) == 1 else 0
+            high = low if len(bounds) == 1 else (
+                None if bounds[1] == "" else int(bounds[1]))
+        except ValueError:
+            raise self.error("Invalid repetition") from None
+        if high is not None and high < low:
+            raise self.error("Min repeat greater than max repeat")
+
+        parts = [node] * low
+        if high is None:
+            parts.append(("star", node))
+        else:
+            parts.extend([("opt", node)] * (high - low))
+        return ("cat", parts) if parts else ("empty",)
+
+    def avoid(self) -> Node:
+        """Parses ((?!X).)*, which has to be at the end of the pattern"""
+        self.position += len("((?!")
+        self.depth += 1
+        node = self.alternation()
+        self.depth -= 1
+        if not self.pattern.startswith(").)*", self.position):
+            raise self.error(
+                "Negative lookahead is only supported as ((?!X).)*")
+        self.position += len(").)*")
+        if not self.at_end():
+            raise self.error(
+                "((?!X).)* is only supported at the end of an option")
+        return ("avoid", node)
+
+    def atom(self) -> Node:
+        char = self.take()
+        if char == "(":
+            if self.pattern.startswith("?:", self.position):
+                self.position += 2
+            elif self.peek() == "?":
+                raise self.error("Unsupported group")
+            self.depth += 1
+            node = self.alternation()
+            if self.take() != ")":
+                raise self.error("Expected )")
+            self.depth -= 1
+            return node
+        if char == "[":
+            return ("set", self.character_class())
+        if char == ".":
+            # Like in re, . doesn't match a newline
+            return ("set", self.alphabet - {"\n"})
+        if char == "\\":
+            return ("set", frozenset(self.escape()) & self.alphabet)
+        if char in "*+?{)|^$":
+            raise self.error(f"Unexpected {char}")
+        return ("set", frozenset([char]) & self.alphabet)
+
+    def escape(self, in_class: bool = False) -> Iterable[str]:
+        """Parses an escape, unsupported escapes raise an error instead of
+        being read as a literal, so they can't silently change the language"""
+        char = self.take()
+        if char in CLASS_ESCAPES:
+            return CLASS_ESCAPES[char]
+        if char.lower() in CLASS_ESCAPES:
+            # \D, \W and \S are the rest of the alphabet
+            return self.alphabet - CLASS_ESCAPES[char.lower()]
+        if char in CONTROL_ESCAPES:
+            return {CONTROL_ESCAPES[char]}
+        if in_class and char == "b":
+            return {"\b"}
+        if char.isalnum() or char == "_":
+            raise self.error(f"Unsupported escape \\{char}")
+        return {char}
+
+    def character_class(self) -> FrozenSet[str]:
+        negated = self.peek() == "^"
+        if negated:
+            self.position += 1
+        chars = set()
+        first = True
+        while first or self.peek() != "]":
+            first = False
+            char = self.take()
+            if char == "\\":
+                chars.update(self.escape(in_class=True))
+            elif self.peek() == "-" and self.pattern[self.position + 1:self.position + 2] not in ("", "]"):
+                self.position += 1
+                end = self.take()
+                if end == "\\":
+                    raise self.error("Unsupported escape in a range")
+                if end < char:
+                    raise self.error("Bad character range")
+                chars.update(chr(i) for i in range(ord(char), ord(end) + 1))
+            else:
+                chars.add(char)
+        self.position += 1
+        return frozenset(self.alphabet - chars if negated else chars & self.alphabet)
+
+
+class _Builder:
+    """Builds an NFA from a syntax tree with Thompson's construction"""
+
+    def __init__(self, alphabet: FrozenSet[str]) -> None:
+        self.alphabet = alphabet
+        self.num_states = 0
+        self.transitions: Dict[Transition, List[int]] = dict()
+
+    def new_state(self) -> int:
+        self.num_states += 1
+        return self.num_states - 1
+
+    def add(self, origin: int, string: str, dest: int) -> None:
+        self.transitions.setdefault(Transition(origin, string), []).append(dest)
+
+    def build(self, node: Node) -> Tuple[int, int]:
+        """Adds the states of a node
+
+        Args:
+            node (Node): The node
+
+        Returns:
+            Tuple[int, int]: The ids of the start and the accepting state of the fragment
+        """
+        kind = node[0]
+        if kind in ("star", "plus", "opt"):
+            inner_start, inner_end = self.build(node[1])
+            start, end = self.new_state(), self.new_state()
+            self.add(start, "", inner_start)
+            self.add(inner_end, "", end)
+            if kind != "plus":
+                self.add(start, "", end)
+            if kind != "opt":
+                self.add(inner_end, "", inner_start)
+            return start, end
+        if kind == "avoid":
+            return self.avoid(node[1])
+
+        start, end = self.new_state(), self.new_state()
+        if kind == "empty":
+            self.add(start, "", end)
+        elif kind == "set":
+            for symbol in node[1]:
+                self.add(start, symbol, end)
+        elif kind == "cat":
+            previous = start
+            for part in node[1]:
+                part_start, part_end = self.build(part)
+                self.add(previous, "", part_start)
+                previous = part_end
+            self.add(previous, "", end)
+        elif kind == "alt":
+            for option in node[1]:
+                option_start, option_end = self.build(option)
+                self.add(start, "", option_start)
+                self.add(option_end, "", end)
+        return start, end
+
+    def avoid(self, node: Node) -> Tuple[int, int]:
+        """Adds the complement of .*X.* by determinizing it
+        and flipping the final states"""
+        anything = ("star", ("set", self.alphabet))
+        contains = nfa_to_dfa(_to_nfa(("cat", [anything, node, anything]), self.alphabet))
+
+        start, end = self.new_state(), self.new_state()
+        ids = {state_id: self.new_state() for state_id in contains.states}
+        self.add(start, "", ids[contains.initial_state.id])
+        for state_id, state in contains.states.items():
+            if not state.final:
+                self.add(ids[state_id], "", end)
+        for transition, dests in contains.transitions.items():
+            # The . in ((?!X).)* doesn't match a newline
+            if transition.string == "\n":
+                continue
+            for dest in dests:
+                self.add(ids[transition.origin], transition.string, ids[dest.id])
+        # Symbols the DFA doesn't know can't be part of X
+        for symbol in self.alphabet - contains.alphabet - {"\n"}:
+            for state_id in ids.values():
+                self.add(state_id, symbol, state_id)
+        return start, end
+
+
+def _to_nfa(node: Node, alphabet: FrozenSet[str]) -> NFA:
+    builder = _Builder(alphabet)
+    start, end = builder.build(node)
+    states = {State(i, f"r{i}", i == start, i == end)
+              for i in range(builder.num_states)}
+    return NFA(states, builder.transitions)
+
+
+def regex_to_nfa(pattern: str, alphabet: Iterable[str]) -> NFA:
+    """Compiles a regex to an NFA over an alphabet with Thompson's construction.
+    Like re.match the regex only has to match at the start of the string,
+    unless it ends with $, which applies to every top level option on its own
+
+    Args:
+        pattern (str): The regex
+        alphabet (Iterable[str]): The symbols, they have to be single characters
+
+    Raises:
+        ValueError: If the regex uses unsupported syntax or a symbol isn't a single character
+
+    Returns:
+        NFA: The NFA
+    """
+    symbols = frozenset(symbol for symbol in alphabet if symbol != "")
+    if any(len(symbol) != 1 for symbol in symbols):
+        raise ValueError("Only single character symbols are supported")
+
+    return _to_nfa(_Parser(pattern, symbols).parse(), symbols)
+
+
+def verify_against_regex_exact(automaton: Automaton, regex: Pattern[str]) -> bool:
+    """Verifies the automaton against a regex by compiling the regex to
+    a DFA and checking that the two DFAs are equivalent
+
+    Args:
+        automaton (Automaton): The automaton to test
+        regex (Pattern[str]): The regex to compare it with
+
+    Raises:
+        ValueError: If the regex uses flags, unsupported syntax or the automaton
+            has symbols that aren't single characters
+
+    Returns:
+        bool: True if they match
+    """
+    if regex.flags & ~re.UNICODE:
+        raise ValueError("Regex flags are not supported")
+    symbols = automaton.symbol_trie.symbols
+    regex_dfa = nfa_to_dfa(regex_to_nfa(regex.pattern, symbols))
+    automaton_dfa = automaton if isinstance(automaton, DFA) else nfa_to_dfa(automaton)
+
+    same, counterexample = equivalent(automaton_dfa, regex_dfa)
+    if same:
+        return True
+    if regex_dfa.check_string_in_language(counterexample):
+        print(f"Regex matched on {counterexample} and automaton didn't")
+    else:
+        print(f"Regex didn't match on {counterexample} and automaton did")
+    return False
@@ -0,0 +1,69 @@
+"""Module containing the Runner class"""
+from typing import TYPE_CHECKING, Any, Tuple
+
+from lib.tokenizer import TokenStream
+
+if TYPE_CHECKING:
+    from lib.automaton import Automaton
+
+
+class Runner:
+    """Runs an automaton over input that arrives in chunks. The
+    configuration of the automaton (a state for a DFA, a set of states
+    for an NFA) is carried across chunks, and symbols that are split
+    across chunk boundaries are completed by the next chunk.
+    """
+
+    def __init__(self, automaton: "Automaton") -> None:
+        self.automaton = automaton
+        self._symbols = automaton.symbol_trie.symbols
+        self._stream = TokenStream(automaton.symbol_trie)
+        self.configuration = automaton.initial_configuration()
+
+    def feed(self, chunk: str) -> None:
+        """Feeds more input
+
+        Args:
+            chunk (str): The input
+        """
+        automaton, symbols = self.automaton, self._symbols
+        configuration = self.configuration
+        for symbol in self._stream.feed(chunk):
+            configuration = automaton.next_configuration(
+                configuration, symbols[symbol])
+        self.configuration = configuration
+
+    @property
+    def accepting(self) -> bool:
+        """True if the input fed so far is inside the language"""
+        tail = self._stream.finish()
+        if tail is None:
+            return False
+
+        configuration = self.configuration
+        for symbol in tail:
+            configuration = self.automaton.next_configuration(
+                configuration, self._symbols[symbol])
+        return self.automaton.is_accepting(configuration)
+
+    def reset(self) -> None:
+        """Starts over as if nothing had been fed"""
+        self._stream.reset()
+        self.configuration = self.automaton.initial_configuration()
+
+    def snapshot(self) -> Tuple[Any, Tuple[int, str, int, int, bool]]:
+        """Returns the state of the runner
+
+        Returns:
+            Tuple[Any, Tuple[int, str, int, int, bool]]: The state, see restore
+        """
+        return (self.configuration, self._stream.snapshot())
+
+    def restore(self, snapshot: Tuple[Any, Tuple[int, str, int, int, bool]]) -> None:
+        """Restores a state returned by snapshot
+
+        Args:
+            snapshot (Tuple[Any, Tuple[int, str, int, int, bool]]): The state
+        """
+        self.configuration, stream = snapshot
+        self._stream.restore(stream)
@@ -0,0 +1,102 @@
+"""Module containing the ByteScanner class"""
+import mmap
+from array import array
+from typing import Iterator, Tuple
+
+from lib.compiled_dfa import DEAD
+from lib.dfa import DFA
+
+
+class ByteScanner:
+    """Runs a DFA over the lines of a file without decoding it.
+
+    The DFA is compiled to a table with 256 entries per state, one for
+    every byte, so it only works for alphabets where every symbol is a
+    single character that is encoded as one byte. Files are memory
+    mapped and read one line at a time.
+    """
+
+    def __init__(self, dfa: DFA, encoding: str = "latin-1") -> None:
+        compiled = dfa.compile()
+        byte_values = []
+        for symbol in compiled.symbols:
+            encoded = symbol.encode(encoding)
+            if len(symbol) != 1 or len(encoded) != 1:
+                raise ValueError(
+                    f"The symbol {symbol} is not a single byte in {encoding}")
+            byte_values.append(encoded[0])
+
+        # The extra state at the end is a trap state. The entries are the
+        # next state times 256 so a step is a single addition and lookup
+        dead = len(compiled.state_ids)
+        self.table = array("l", [dead * 256]) * ((dead + 1) * 256)
+        for state in range(dead):
+            for symbol, byte in enumerate(byte_values):
+                dest = compiled.step(state, symbol)
+                if dest != DEAD:
+                    self.table[state * 256 + byte] = dest * 256
+        self.finals = bytearray(compiled.finals) + b"\0"
+        self.initial = compiled.initial * 256
+
+    def accepts(self, line: bytes) -> bool:
+        """Check if a line of bytes is inside the language
+
+        Args:
+            line (bytes): The line, without the newline
+
+        Returns:
+            bool: True if the line is inside the language
+        """
+        table = self.table
+        state = self.initial
+        for byte in line:
+            state = table[state + byte]
+        return bool(self.finals[state >> 8])
+
+    def scan(self, path: str) -> Iterator[Tuple[int, bytes]]:
+        """Finds the lines of a file that are inside the language. The
+        file is memory mapped and only one line is copied at a time
+
+        Args:
+            path (str): The path to the file
+
+        Yields:
+            Iterator[Tuple[int, bytes]]: The offset and contents of every accepted line
+        """
+        with open(path, "rb") as f:
+            # Empty files can't be mapped
+            if f.seek(0, 2) == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                start, size = 0, len(mapped)
+                while start < size:
+                    end = mapped.find(b"\n", start)
+                    if end == -1:
+                        end = size
+                    line = mapped[start:end]
+                    if self.accepts(line):
+                        yield start, line
+                    start = end + 1
+
+    def match_offsets(self, path: str) -> Iterator[int]:
+        """Finds the offsets of the lines of a file that are inside the language
+
+        Args:
+            path (str): The path to the file
+
+        Yields:
+            Iterator[int]: The offset of every accepted line
+        """
+        for offset, _ in self.scan(path):
+            yield offset
+
+    def count_matches(self, path: str) -> int:
+        """Counts the lines of a file that are inside the language
+
+        Args:
+            path (str): The path to the file
+
+        Returns:
+            int: The number of accepted lines
+        """
+        return sum(1 for _ in self.scan(path))
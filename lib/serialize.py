@@ -0,0 +1,162 @@
+"""This module contains a binary format for automatons and a cache for parsed JFLAP files
+
+The format is a header followed by sections that are each padded to 8 bytes:
+    state ids, final flags, state names, labels, CSR offsets, CSR labels, CSR targets
+The integer arrays are stored in native byte order with the item size in the
+header, so loading them is a single copy into an array.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from typing import List, Optional, Union
+
+from lib.automaton import Automaton
+from lib.dfa import DFA
+from lib.nfa import NFA
+from lib.parser import parse_jflap_dfa, parse_jflap_nfa
+
+MAGIC = b"AUTM"
+VERSION = 2
+# magic, version, kind, item size, initial state, number of states,
+# size of the names, number of labels, size of the labels, number of targets
+HEADER = struct.Struct("=4sBBBxqqqqqq")
+KINDS = {0: DFA, 1: NFA}
+# The number of bytes of a JFLAP file that are hashed at a time
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def _pad(size: int) -> int:
+    return -size % 8
+
+
+def _encode_strings(strings: List[str]) -> bytes:
+    # Every string is prefixed with its length so any character can be used
+    parts = []
+    for string in strings:
+        encoded = string.encode("utf-8")
+        parts.append(struct.pack("=I", len(encoded)))
+        parts.append(encoded)
+    return b"".join(parts)
+
+
+def _decode_strings(data: bytes, count: int) -> List[str]:
+    strings, position = [], 0
+    for _ in range(count):
+        (length,) = struct.unpack_from("=I", data, position)
+        position += 4
+        strings.append(data[position:position + length].decode("utf-8"))
+        position += length
+    return strings
+
+
+def save(automaton: Union[DFA, NFA], path: str) -> None:
+    """Saves an automaton in the binary format
+
+    Args:
+        automaton (Union[DFA, NFA]): The automaton
+        path (str): The path of the file
+    """
+    kind = 1 if isinstance(automaton, NFA) else 0
+    ids = array("l", automaton._ids)
+    names = _encode_strings(automaton._names)
+    labels = _encode_strings(automaton._labels)
+    header = HEADER.pack(MAGIC, VERSION, kind, ids.itemsize, automaton._initial,
+                         len(ids), len(names), len(automaton._labels), len(labels),
+                         len(automaton._targets))
+
+    with open(path, "wb") as f:
+        f.write(header)
+        for section in (ids.tobytes(), bytes(automaton._finals), names, labels,
+                        automaton._offsets.tobytes(), automaton._edge_labels.tobytes(),
+                        automaton._targets.tobytes()):
+            f.write(section)
+            f.write(b"\0" * _pad(len(section)))
+
+
+def load(path: str) -> Automaton:
+    """Loads an automaton saved with save
+
+    Args:
+        path (str): The path of the file
+
+    Returns:
+        Automaton: The DFA or NFA
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        (magic, version, kind, itemsize, initial, num_states, names_size,
+         num_labels, labels_size, num_targets) = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION or kind not in KINDS:
+            raise ValueError(f"{path} is not a saved automaton")
+        if itemsize != array("l").itemsize:
+            raise ValueError(f"{path} was saved on a platform with other integer sizes")
+
+        position = HEADER.size
+
+        def section(size: int) -> bytes:
+            nonlocal position
+            start = position
+            position += size + _pad(size)
+            return data[start:start + size]
+
+        def int_array(count: int) -> array:
+            result = array("l")
+            result.frombytes(section(count * itemsize))
+            return result
+
+        ids = int_array(num_states).tolist()
+        finals = bytearray(section(num_states))
+        names = _decode_strings(section(names_size), num_states)
+        labels = _decode_strings(section(labels_size), num_labels)
+        offsets = int_array(num_states + 1)
+        edge_labels = int_array(num_targets)
+        targets = int_array(num_targets)
+
+    return KINDS[kind]._from_arrays(ids, names, finals, initial, labels, offsets,
+                                    edge_labels, targets)
+
+
+def _default_cache_dir() -> str:
+    return os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+                        "automata-utils")
+
+
+def load_jflap_cached(path: str, nfa: bool = False, cache_dir: Optional[str] = None) -> Automaton:
+    """Parses a JFLAP xml file, or loads it from the cache if a file with
+    the same contents was parsed before
+
+    Args:
+        path (str): The path to the JFLAP xml file
+        nfa (bool, optional): Parse it as an NFA instead of a DFA. Defaults to False.
+        cache_dir (Optional[str], optional): The cache directory. Defaults to $XDG_CACHE_HOME/automata-utils.
+
+    Returns:
+        Automaton: The DFA or NFA
+    """
+    # Hash in chunks so large files are never read into memory at once
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    digest = sha256.hexdigest()
+
+    cache_dir = cache_dir or _default_cache_dir()
+    cached = os.path.join(
+        cache_dir, f"{digest}-{'nfa' if nfa else 'dfa'}-v{VERSION}.bin")
+    if os.path.exists(cached):
+        return load(cached)
+
+    automaton = parse_jflap_nfa(path) if nfa else parse_jflap_dfa(path)
+    # Write to a temporary file first so other processes never see half a file
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=cache_dir)
+    os.close(fd)
+    try:
+        save(automaton, tmp)
+        os.replace(tmp, cached)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return automaton
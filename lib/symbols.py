@@ -0,0 +1,183 @@
+"""Module containing the SymbolTable class"""
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# The symbol for the empty string in grammars
+EMPTY = "!"
+
+# A tail of a production as symbol ids, the empty string is ()
+Tail = Tuple[int, ...]
+
+
+def fresh_name(count: int) -> str:
+    """Returns the name of the count-th new variable, A to Z and then
+    A1 to Z1, A2 to Z2 and so on, so it never runs out
+
+    Args:
+        count (int): The number of names that came before it
+
+    Returns:
+        str: The name
+    """
+    suffix = str(count // 26) if count >= 26 else ""
+    return chr(ord("A") + count % 26) + suffix
+
+
+def fresh_names() -> Iterator[str]:
+    """Yields the names for new variables in the order of fresh_name
+
+    Yields:
+        Iterator[str]: The names
+    """
+    count = 0
+    while True:
+        yield fresh_name(count)
+        count += 1
+
+
+def split_tail(tail: str) -> List[str]:
+    """Splits the tail of a production into symbols. Tails with
+    whitespace are split on it, otherwise every character is a symbol.
+    A "!" between spaces is the empty string, so a single terminal with
+    more than one character can be written as "ab !"
+
+    Args:
+        tail (str): The tail, "!" is the empty string
+
+    Returns:
+        List[str]: The names of the symbols
+    """
+    if tail == EMPTY:
+        return []
+    if any(char.isspace() for char in tail):
+        return [name for name in tail.split() if name != EMPTY]
+    return list(tail)
+
+
+class SymbolTable:
+    """Interns the variables and terminals of a grammar as ints.
+
+    Ids are never reused or removed, so copies of the same productions
+    can share a table until one of them adds a symbol, see
+    Productions.writable_symbols. A symbol is a variable once it has been
+    added as a variable, for example as the head of a production.
+    """
+
+    def __init__(self) -> None:
+        self._names: List[str] = []
+        self._ids: Dict[str, int] = dict()
+        self._variables = bytearray()
+        # The number of names of fresh_name that were tried
+        self._fresh = 0
+
+    def copy(self) -> "SymbolTable":
+        table = SymbolTable()
+        table._names = list(self._names)
+        table._ids = dict(self._ids)
+        table._variables = bytearray(self._variables)
+        table._fresh = self._fresh
+        return table
+
+    def add(self, name: str, variable: bool = False) -> int:
+        """Returns the id of a symbol and adds it if it is new
+
+        Args:
+            name (str): The name of the symbol
+            variable (bool, optional): Mark the symbol as a variable. Defaults to False.
+
+        Returns:
+            int: The id of the symbol
+        """
+        symbol = self._ids.get(name)
+        if symbol is None:
+            symbol = self._ids[name] = len(self._names)
+            self._names.append(name)
+            self._variables.append(variable)
+        elif variable:
+            self._variables[symbol] = True
+        return symbol
+
+    def split_tail(self, tail: str) -> List[str]:
+        """Splits the tail of a production into symbols like split_tail,
+        but a tail without whitespace that is the name of a known variable
+        with more than one character is that variable, like S -> S1
+
+        Args:
+            tail (str): The tail, "!" is the empty string
+
+        Returns:
+            List[str]: The names of the symbols
+        """
+        if len(tail) > 1 and self._is_variable_name(tail):
+            return [tail]
+        return split_tail(tail)
+
+    def _is_variable_name(self, name: str) -> bool:
+        symbol = self._ids.get(name)
+        return symbol is not None and bool(self._variables[symbol])
+
+    def add_tail(self, tail: str) -> Tail:
+        """Adds the symbols of the tail of a production
+
+        Args:
+            tail (str): The tail, split with SymbolTable.split_tail
+
+        Returns:
+            Tail: The ids of the symbols
+        """
+        return tuple(self.add(name) for name in self.split_tail(tail))
+
+    def fresh_variable(self) -> int:
+        """Adds a variable with a name that isn't used yet
+
+        Returns:
+            int: The id of the variable
+        """
+        name = fresh_name(self._fresh)
+        while name in self._ids:
+            self._fresh += 1
+            name = fresh_name(self._fresh)
+        self._fresh += 1
+        return self.add(name, variable=True)
+
+    def get(self, name: str) -> Optional[int]:
+        return self._ids.get(name)
+
+    def name(self, symbol: int) -> str:
+        return self._names[symbol]
+
+    def names(self, tail: Iterable[int]) -> Tuple[str, ...]:
+        return tuple(self._names[symbol] for symbol in tail)
+
+    def is_variable(self, symbol: int) -> bool:
+        return bool(self._variables[symbol])
+
+    def format_tail(self, tail: Tail) -> str:
+        """Formats a tail like it is written in grammar files
+
+        Args:
+            tail (Tail): The ids of the symbols
+
+        Returns:
+            str: The tail, written so SymbolTable.split_tail gives back the
+            same symbols. Symbols are separated by spaces if one has more than
+            one character or if the joined characters are the name of a
+            variable, and a single terminal with more than one character
+            is followed by " !"
+        """
+        if not tail:
+            return EMPTY
+        names = self.names(tail)
+        joined = "".join(names)
+        if len(names) == 1:
+            if len(joined) > 1 and not self.is_variable(tail[0]):
+                return f"{joined} {EMPTY}"
+            return joined
+        if all(len(name) == 1 for name in names) and not self._is_variable_name(joined):
+            return joined
+        return " ".join(names)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._ids
+
+    def __len__(self) -> int:
+        return len(self._names)
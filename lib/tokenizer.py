@@ -0,0 +1,161 @@
+"""Module containing the SymbolTrie and TokenStream classes"""
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+
+class SymbolTrie:
+    """A trie over the symbols of an alphabet used to split strings
+    into symbols. The empty string is never a symbol here since it
+    can't be read from the input.
+    """
+
+    def __init__(self, alphabet: Iterable[str]) -> None:
+        # Symbols are indexed in sorted order
+        self.symbols: List[str] = sorted(
+            symbol for symbol in set(alphabet) if symbol != "")
+        self.symbol_index: Dict[str, int] = {
+            symbol: i for i, symbol in enumerate(self.symbols)}
+        self.max_length = max((len(symbol)
+                              for symbol in self.symbols), default=0)
+
+        # Node 0 is the root, terminal is the index of the
+        # symbol that ends in that node or -1
+        self._children: List[Dict[str, int]] = [dict()]
+        self._terminal: List[int] = [-1]
+        for index, symbol in enumerate(self.symbols):
+            node = 0
+            for char in symbol:
+                child = self._children[node].get(char)
+                if child is None:
+                    child = len(self._children)
+                    self._children.append(dict())
+                    self._terminal.append(-1)
+                    self._children[node][char] = child
+                node = child
+            self._terminal[node] = index
+
+    def tokenize(self, string: str, indices: bool = False) -> Optional[List[Union[str, int]]]:
+        """Splits a string into symbols by repeatedly taking the longest
+        symbol that the rest of the string starts with. This is linear in
+        the length of the string for a fixed alphabet.
+
+        Args:
+            string (str): The string to split
+            indices (bool, optional): Return symbol indices instead of symbols. Defaults to False.
+
+        Returns:
+            Optional[List[Union[str, int]]]: The symbols or None if the string can't be
+            split into symbols of the alphabet
+        """
+        children, terminal, symbols = self._children, self._terminal, self.symbols
+        tokens = []
+        start, length = 0, len(string)
+        while start < length:
+            node, match, end = 0, -1, start
+            for i in range(start, length):
+                node = children[node].get(string[i])
+                if node is None:
+                    break
+                if terminal[node] != -1:
+                    match, end = terminal[node], i + 1
+
+            if match == -1:
+                return None
+            tokens.append(match if indices else symbols[match])
+            start = end
+
+        return tokens
+
+
+class TokenStream:
+    """Splits input that arrives in chunks into symbols of a SymbolTrie,
+    giving the same symbols as tokenizing the whole input at once. Only
+    the input after the last complete symbol is kept, which is never
+    longer than the longest symbol.
+    """
+
+    def __init__(self, trie: SymbolTrie) -> None:
+        self.trie = trie
+        self.reset()
+
+    def reset(self) -> None:
+        """Starts over as if nothing had been fed"""
+        # The trie node reached by the pending input, the pending input,
+        # and the longest symbol the pending input starts with and its length
+        self._node = 0
+        self._pending = ""
+        self._match = -1
+        self._match_end = 0
+        # Set when the input can't be split into symbols
+        self.failed = False
+
+    def feed(self, chunk: str) -> List[int]:
+        """Feeds more input
+
+        Args:
+            chunk (str): The input
+
+        Returns:
+            List[int]: The indices of the symbols that were completed by the input
+        """
+        children, terminal = self.trie._children, self.trie._terminal
+        tokens = []
+        # Input that has to be read again after a symbol is completed,
+        # it's never longer than the longest symbol
+        replay = ""
+        position, length = 0, len(chunk)
+        while not self.failed:
+            if replay:
+                char, replay = replay[0], replay[1:]
+            elif position < length:
+                char = chunk[position]
+                position += 1
+            else:
+                break
+
+            child = children[self._node].get(char)
+            if child is not None:
+                self._node = child
+                self._pending += char
+                if terminal[child] != -1:
+                    self._match, self._match_end = terminal[child], len(
+                        self._pending)
+                continue
+
+            if self._match == -1:
+                self.failed = True
+                break
+            # The longest symbol is complete, what came after
+            # it has to be read again from the root
+            tokens.append(self._match)
+            replay = self._pending[self._match_end:] + char + replay
+            self._node, self._pending = 0, ""
+            self._match, self._match_end = -1, 0
+        return tokens
+
+    def finish(self) -> Optional[List[int]]:
+        """Returns the symbols the pending input would be split into if
+        the input ended here. The stream isn't changed
+
+        Returns:
+            Optional[List[int]]: The indices of the symbols or None if the input
+            can't be split into symbols
+        """
+        if self.failed:
+            return None
+        return self.trie.tokenize(self._pending, indices=True)
+
+    def snapshot(self) -> Tuple[int, str, int, int, bool]:
+        """Returns the state of the stream
+
+        Returns:
+            Tuple[int, str, int, int, bool]: The state, see restore
+        """
+        return (self._node, self._pending, self._match, self._match_end, self.failed)
+
+    def restore(self, snapshot: Tuple[int, str, int, int, bool]) -> None:
+        """Restores a state returned by snapshot
+
+        Args:
+            snapshot (Tuple[int, str, int, int, bool]): The state
+        """
+        self._node, self._pending, self._match, self._match_end, self.failed = snapshot
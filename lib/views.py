@@ -0,0 +1,59 @@
+"""Module containing read only views on the compact representation of an automaton"""
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Iterator, Set
+
+from lib.state import State
+from lib.transition import Transition
+
+if TYPE_CHECKING:
+    from lib.automaton import Automaton
+
+
+class StatesView(Mapping):
+    """Maps state ids to State tuples that are created on access"""
+
+    def __init__(self, automaton: "Automaton") -> None:
+        self._automaton = automaton
+
+    def __getitem__(self, state_id: int) -> State:
+        return self._automaton._state(self._automaton._index[state_id])
+
+    def __contains__(self, state_id: object) -> bool:
+        return state_id in self._automaton._index
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._automaton._ids)
+
+    def __len__(self) -> int:
+        return len(self._automaton._ids)
+
+
+class TransitionsView(Mapping):
+    """Maps transitions to the set of destination states, only
+    transitions that have a destination are in the view
+    """
+
+    def __init__(self, automaton: "Automaton") -> None:
+        self._automaton = automaton
+
+    def __getitem__(self, transition: Transition) -> Set[State]:
+        automaton = self._automaton
+        state = automaton._index.get(transition.origin)
+        label = automaton._label_index.get(transition.string)
+        if state is None or label is None:
+            raise KeyError(transition)
+        dests = automaton._dests(state, label)
+        if not dests:
+            raise KeyError(transition)
+        return {automaton._state(dest) for dest in dests}
+
+    def __iter__(self) -> Iterator[Transition]:
+        automaton = self._automaton
+        for state, state_id in enumerate(automaton._ids):
+            for label in automaton._state_labels(state):
+                yield Transition(state_id, automaton._labels[label])
+
+    def __len__(self) -> int:
+        automaton = self._automaton
+        return sum(1 for state in range(len(automaton._ids))
+                   for _ in automaton._state_labels(state))
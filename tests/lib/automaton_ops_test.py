@@ -1,7 +1,32 @@
 
 
-from lib.automaton_ops import dell, bin, unit
+import itertools
+import re
+
+from lib.automaton_ops import (bin, convert_to_chomsky,
+                                create_distinguishability_table, dell,
+                                enumerate_language,
+                                equivalent, find_distinguishing_strings, minimize,
+                                nfa_to_dfa, product_construction, term, unit,
+                                verify_against_method,
+                                verify_against_method_parallel,
+                                verify_against_regex_parallel,
+                                verify_exhaustive)
+from lib import instrumentation
+from lib.cyk import CYKParser
+from lib.dfa import DFA
+from lib.nfa import NFA
 from lib.parser import parse_cfg_string
+from lib.state import State
+from lib.transition import Transition
+from tests.lib.dfa_test import even_a_dfa
+from tests.lib.nfa_test import ends_with_ab_nfa
+
+
+def all_strings(symbols, max_length):
+    for length in range(max_length + 1):
+        for string in itertools.product(symbols, repeat=length):
+            yield "".join(string)
 
 
 def test_del():
@@ -17,6 +42,21 @@ C -> c''')
     assert res == expected and res != cfg
 
 
+def test_del_removes_empty_variables():
+    cfg = parse_cfg_string('''S -> aBc | d | aX
+X -> BB
+B -> !''')
+    res = dell(cfg, False)
+    assert res.get_productions().get_dict_productions() == {"S": ["ac", "d", "a"]}
+
+    res = convert_to_chomsky(cfg)
+    assert set(enumerate_language(res, 4)) == {"ac", "d", "a"}
+    productions = res.get_productions().get_dict_productions()
+    assert all(productions.values())
+    assert "B" not in productions and "X" not in productions
+    assert not any("B" in tail or "X" in tail for tails in productions.values() for tail in tails)
+
+
 def test_bin():
     cfg = parse_cfg_string('''E -> EOE | N
 O -> + | - | !
@@ -42,3 +82,277 @@ Y -> a | b ''')
     res = unit(cfg, False)
     res.remove_unreachable_productions()
     assert res == expected and res != cfg
+
+
+def test_convert_to_chomsky():
+    cfg = parse_cfg_string('''S -> aSb | T | SS
+T -> U | ! | cTc
+U -> c | dU''')
+    res = convert_to_chomsky(cfg)
+    parser = CYKParser(res)
+    expected = set(enumerate_language(cfg, 6))
+    for string in all_strings("abcd", 6):
+        assert parser.check_string_in_language(string) == (string in expected)
+
+
+def test_convert_to_chomsky_many_variables():
+    # Needs far more than 26 new variables
+    cfg = parse_cfg_string("\n".join(
+        [f"S -> {' | '.join(' '.join('ab' * i) + ' S S2' for i in range(1, 30))} | !",
+         "S2 -> a a | b"]))
+    res = convert_to_chomsky(cfg)
+    assert len(res.get_variables()) > 26
+    parser = CYKParser(res)
+    expected = set(enumerate_language(cfg, 8))
+    for string in all_strings("ab", 8):
+        assert parser.check_string_in_language(string) == (string in expected)
+
+    # The terminal a is also a prefix of the terminal ab
+    res = term(parse_cfg_string("S -> a ab S | !"), False)
+    productions = res.get_productions().get_dict_productions()
+    new_vars = {tail: head for head, tails in productions.items()
+                for tail in tails if head != "S"}
+    assert set(new_vars) == {"a", "ab !"}
+    assert productions["S"] == [new_vars["a"] + new_vars["ab !"] + "S", "!"]
+
+
+def test_grammar_transforms_are_pure():
+    cfg = parse_cfg_string('''S -> ABAC | !
+A -> aA | !
+B -> bB | !
+C -> c''')
+    before = cfg.get_productions().get_dict_productions()
+    for transform in [bin, dell, unit, term, lambda cfg, _: convert_to_chomsky(cfg)]:
+        first, second = transform(cfg, False), transform(cfg, False)
+        assert first == second and second == first
+        assert first.get_start_state() == second.get_start_state()
+        assert cfg.get_productions().get_dict_productions() == before
+        assert cfg.get_symbols().get("D") is None
+
+    # The new variables get the same names every time
+    assert bin(cfg, False).get_variables() == bin(cfg, False).get_variables() == {
+        "S", "A", "B", "C", "D", "E"}
+
+
+def test_nfa_to_dfa():
+    nfa = ends_with_ab_nfa()
+    dfa = nfa_to_dfa(nfa)
+    assert dfa.check_complete()
+    for string in all_strings("ab", 6):
+        assert dfa.check_string_in_language(
+            string) == nfa.check_string_in_language(string)
+
+
+def test_nfa_to_dfa_multi_character_symbols():
+    # A step on "ab" also steps on "a"
+    states = {State(0, "q0", True, False), State(1, "q1", False, True),
+              State(2, "q2", False, False)}
+    transitions = {
+        Transition(0, "a"): [1],
+        Transition(0, "ab"): [2],
+        Transition(2, "c"): [1],
+        Transition(1, ""): [2],
+    }
+    nfa = NFA(states, transitions)
+    dfa = nfa_to_dfa(nfa)
+    for string in all_strings(["a", "ab", "c"], 4):
+        assert dfa.check_string_in_language(
+            string) == nfa.check_string_in_language(string)
+
+
+def test_minimize():
+    # q0 and q2 are equivalent, q3 is unreachable and there is
+    # no transition from q1 on "b"
+    states = {State(0, "q0", True, False), State(1, "q1", False, True),
+              State(2, "q2", False, False), State(3, "q3", False, True)}
+    transitions = {
+        Transition(0, "a"): [1],
+        Transition(0, "b"): [2],
+        Transition(1, "a"): [1],
+        Transition(2, "a"): [1],
+        Transition(2, "b"): [0],
+        Transition(3, "a"): [3],
+    }
+    dfa = DFA(states, transitions)
+    minimized, mapping = minimize(dfa)
+    assert len(minimized.states) == 2
+    assert mapping[0] == mapping[2] != mapping[1] and 3 not in mapping
+    for string in all_strings("ab", 6):
+        assert minimized.check_string_in_language(
+            string) == dfa.check_string_in_language(string)
+
+    untrimmed, mapping = minimize(dfa, trim=False)
+    assert len(untrimmed.states) == 2 and mapping[3] == mapping[1]
+
+
+def test_minimize_splits_final_block():
+    # Accepts "" and "a", q0 and q1 are final but not equivalent
+    states = {State(0, "q0", True, True), State(1, "q1", False, True),
+              State(2, "q2", False, False)}
+    transitions = {
+        Transition(0, "a"): [1],
+        Transition(1, "a"): [2],
+        Transition(2, "a"): [2],
+    }
+    dfa = DFA(states, transitions)
+    minimized, mapping = minimize(dfa)
+    assert len(minimized.states) == 3 and mapping[0] != mapping[1]
+    assert equivalent(dfa, minimized) == (True, None)
+    for string in all_strings("a", 4):
+        assert minimized.check_string_in_language(
+            string) == dfa.check_string_in_language(string)
+
+
+def test_minimize_subset_construction():
+    dfa = nfa_to_dfa(ends_with_ab_nfa())
+    minimized, _ = minimize(dfa)
+    assert len(minimized.states) == 3
+    for string in all_strings("ab", 6):
+        assert minimized.check_string_in_language(
+            string) == dfa.check_string_in_language(string)
+
+
+def test_find_distinguishing_strings():
+    # Ends with "ab", q3 is equivalent to q0
+    states = {State(0, "q0", True, False), State(1, "q1", False, False),
+              State(2, "q2", False, True), State(3, "q3", False, False)}
+    transitions = {
+        Transition(0, "a"): [1], Transition(0, "b"): [0],
+        Transition(1, "a"): [1], Transition(1, "b"): [2],
+        Transition(2, "a"): [1], Transition(2, "b"): [3],
+        Transition(3, "a"): [1], Transition(3, "b"): [0],
+    }
+    dfa = DFA(states, transitions)
+    assert find_distinguishing_strings(dfa) == {
+        (1, 0): "b", (2, 0): "", (2, 1): "", (3, 1): "b", (3, 2): ""}
+    assert create_distinguishability_table(dfa) == {
+        0: {}, 1: {0: "X"}, 2: {0: "X", 1: "X"}, 3: {0: "", 1: "X", 2: "X"}}
+
+
+def test_find_distinguishing_strings_overlapping_symbols():
+    # "ab" is read as the symbol ab, so q0 never reaches q2 and is
+    # equivalent to the trap state q3
+    dfa = symbol_sequence_dfa(["a", "ab", "b"], [["a", "b"]])
+    assert find_distinguishing_strings(dfa) == {
+        (1, 0): "b", (2, 0): "", (2, 1): "", (3, 1): "b", (3, 2): ""}
+    assert create_distinguishability_table(dfa)[3][0] == ""
+
+
+def test_product_construction():
+    even_a = even_a_dfa()
+    ends_with_ab = nfa_to_dfa(ends_with_ab_nfa())
+    rules = {
+        "intersection": lambda x, y: x and y,
+        "union": lambda x, y: x or y,
+        "difference": lambda x, y: x and not y,
+        "symmetric_difference": lambda x, y: x != y,
+    }
+    for operation, rule in rules.items():
+        product = product_construction(even_a, ends_with_ab, operation)
+        for string in all_strings("ab", 6):
+            assert product.check_string_in_language(string) == rule(
+                even_a.check_string_in_language(string),
+                ends_with_ab.check_string_in_language(string))
+
+
+def test_equivalent():
+    dfa = nfa_to_dfa(ends_with_ab_nfa())
+    minimized, _ = minimize(dfa)
+    assert equivalent(dfa, minimized) == (True, None)
+    assert equivalent(dfa, even_a_dfa()) == (False, "")
+    assert equivalent(even_a_dfa(), product_construction(
+        even_a_dfa(), dfa, "union")) == (False, "ab")
+
+
+def symbol_sequence_dfa(symbols, accepted):
+    """A DFA that accepts exactly some sequences of symbols"""
+    prefixes = sorted({tuple(sequence[:i]) for sequence in accepted
+                       for i in range(len(sequence) + 1)})
+    ids = {prefix: i for i, prefix in enumerate(prefixes)}
+    trap = len(prefixes)
+    states = {State(i, f"q{i}", prefix == (), prefix in map(tuple, accepted))
+              for prefix, i in ids.items()} | {State(trap, "trap", False, False)}
+    transitions = {Transition(i, symbol): [ids.get(prefix + (symbol,), trap)]
+                   for prefix, i in ids.items() for symbol in symbols}
+    transitions.update({Transition(trap, symbol): [trap] for symbol in symbols})
+    return DFA(states, transitions)
+
+
+def test_equivalent_overlapping_symbols():
+    symbols = ["a", "ab", "b"]
+    # "ab" is always read as the symbol ab, so a then b never happens
+    dfa = symbol_sequence_dfa(symbols, [["a", "b"], ["a", "a"]])
+    assert equivalent(dfa, symbol_sequence_dfa(symbols, [["a", "a"]])) == (True, None)
+    assert equivalent(dfa, symbol_sequence_dfa(symbols, [["a", "a"], ["ab"]])) == (False, "ab")
+
+    # Without the symbol ab, "ab" is a then b
+    assert equivalent(dfa, symbol_sequence_dfa(["a", "b"], [["a", "b"], ["a", "a"]])) == (
+        False, "ab")
+    other = symbol_sequence_dfa(["a", "b"], [["a", "b"]])
+    assert equivalent(other, symbol_sequence_dfa(symbols, [["ab"]])) == (True, None)
+    same, witness = equivalent(other, symbol_sequence_dfa(symbols, [["a", "ab"]]))
+    assert not same and other.check_string_in_language(witness) != symbol_sequence_dfa(
+        symbols, [["a", "ab"]]).check_string_in_language(witness)
+
+
+def test_verify_exhaustive():
+    def ends_with_ab(string):
+        return string.endswith("ab")
+
+    for automaton in (ends_with_ab_nfa(), nfa_to_dfa(ends_with_ab_nfa())):
+        result = verify_exhaustive(automaton, ends_with_ab, 5)
+        assert result.mismatch is None
+        assert result.counts == {0: 1, 1: 2, 2: 4, 3: 8, 4: 16, 5: 32}
+        assert verify_against_method(automaton, ends_with_ab,
+                                     max_sample_num=6, exhaustive=True)
+
+    result = verify_exhaustive(
+        ends_with_ab_nfa(), lambda string: "ab" in string, 5)
+    assert result.mismatch == "aba" and result.expected
+    assert result.counts == {0: 1, 1: 2, 2: 4, 3: 3}
+
+
+def test_verify_exhaustive_multi_character_symbols():
+    # Accepts an even number of symbols, a and ab overlap
+    states = {State(0, "q0", True, True), State(1, "q1", False, False)}
+    for symbols, reruns in [(["a", "bc"], 0), (["a", "ab", "b"], 7)]:
+        transitions = {Transition(i, symbol): [1 - i]
+                       for i in range(2) for symbol in symbols}
+        for automaton in (NFA(states, transitions), DFA(states, transitions)):
+            def even(string):
+                return len(automaton.symbol_trie.tokenize(string)) % 2 == 0
+
+            with instrumentation.profile() as profile:
+                result = verify_exhaustive(automaton, even, 3)
+            assert result.mismatch is None
+            # Only strings that are read as other symbols are run again
+            counters = profile.stats.counters
+            assert counters.get("nfa.strings", 0) + counters.get("dfa.strings", 0) == reruns
+
+
+def contains_ab(string):
+    return "ab" in string
+
+
+def test_verify_parallel():
+    dfa = nfa_to_dfa(ends_with_ab_nfa())
+    assert verify_against_regex_parallel(dfa, re.compile(r"^[ab]*ab$"), test_num=200,
+                                         max_sample_num=6, workers=2, shard_size=50)
+    assert not verify_against_method_parallel(dfa, contains_ab, test_num=200,
+                                              max_sample_num=6, workers=2, shard_size=50)
+
+
+def test_enumerate_language():
+    cfg = parse_cfg_string('''S -> aSb | T
+T -> U | !
+U -> c''')
+    assert list(enumerate_language(cfg, 5)) == [
+        "", "c", "ab", "acb", "aabb", "aacbb"]
+
+    # Removing nullable variables only drops the empty string
+    cfg = parse_cfg_string('''S -> ABAC
+A -> aA | !
+B -> bB | !
+C -> c''')
+    assert list(enumerate_language(cfg, 6)) == list(
+        enumerate_language(dell(cfg, False), 6))
@@ -0,0 +1,37 @@
+from lib.nfa import NFA
+from lib.state import State
+from lib.transition import Transition
+from tests.lib.nfa_test import ends_with_ab_nfa
+
+
+def test_states_view():
+    nfa = ends_with_ab_nfa()
+    assert sorted(nfa.states) == [0, 1, 2, 3]
+    assert nfa.states[3] == State(3, "q3", False, True)
+    assert nfa.initial_state == State(0, "q0", True, False)
+    assert 4 not in nfa.states and nfa.states.get(4) is None
+
+
+def test_transitions_view():
+    nfa = ends_with_ab_nfa()
+    assert set(nfa.transitions) == {Transition(0, "a"), Transition(0, "b"),
+                                    Transition(1, "b"), Transition(2, "")}
+    assert nfa.transitions[Transition(0, "a")] == {
+        State(0, "q0", True, False), State(1, "q1", False, False)}
+    assert nfa.get_transition(1, "a") is None
+    assert nfa.get_transition(2, "") == {State(3, "q3", False, True)}
+    assert nfa.alphabet == {"", "a", "b"}
+
+
+def test_sparse_transitions():
+    # Most states only have transitions on a few of the many symbols
+    symbols = [f"s{i}" for i in range(100)]
+    states = {State(i, f"q{i}", i == 0, i == 9) for i in range(10)}
+    transitions = {Transition(i, symbols[(i * 7) % 100]): [(i + 1) % 10] for i in range(10)}
+    transitions[Transition(3, symbols[0])] = [0, 5]
+    nfa = NFA(states, transitions)
+    assert len(nfa._targets) == 12 and len(nfa._offsets) == 11
+    assert len(nfa.transitions) == 11 and set(nfa.transitions) == set(transitions)
+    for transition, dests in transitions.items():
+        assert {state.id for state in nfa.transitions[transition]} == set(dests)
+    assert nfa.get_transition(4, symbols[0]) is None
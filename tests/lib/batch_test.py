@@ -0,0 +1,13 @@
+from lib.batch import check_strings
+from tests.lib.dfa_test import even_a_dfa
+
+
+def test_check_strings():
+    dfa = even_a_dfa()
+    strings = ["", "a", "aa", "abab", "ab", "ac", "bbbbbbba"]
+    result = check_strings(dfa, strings)
+    assert result.tolist() == [dfa.check_string_in_language(s) for s in strings]
+
+
+def test_check_strings_empty():
+    assert check_strings(even_a_dfa(), []).tolist() == []
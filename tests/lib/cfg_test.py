@@ -0,0 +1,62 @@
+from lib.parser import parse_cfg_string
+
+
+def test_get_productions_copy_on_write():
+    cfg = parse_cfg_string('''S -> aS | A
+A -> b''')
+    snapshot = cfg.get_productions()
+    assert snapshot.get_dict_productions_raw() is cfg.get_dict_productions_raw()
+
+    snapshot.add_production("S", "c")
+    snapshot.remove_production("A", "b")
+    assert cfg.get_productions().get_dict_productions() == {"S": ["aS", "A"], "A": ["b"]}
+    assert snapshot.get_dict_productions() == {"S": ["aS", "A", "c"]}
+
+    # Only the changed heads were copied
+    cfg.add_production("B", "b")
+    other = cfg.get_productions()
+    other.add_production("S", "d")
+    a = cfg.get_symbols().get("A")
+    assert other.get_dict_productions_raw()[a] is cfg.get_dict_productions_raw()[a]
+    assert cfg.get_productions().get_dict_productions()["S"] == ["aS", "A"]
+
+    writable = other.get_dict_productions_writable()
+    writable[a].append(())
+    assert cfg.get_productions().get_dict_productions()["A"] == ["b"]
+
+
+def test_multi_character_symbols():
+    cfg = parse_cfg_string('''S -> a S1 b | !
+S1 -> ab | S1 S1''')
+    symbols = cfg.get_symbols()
+    assert symbols.is_variable(symbols.get("S1"))
+    assert not symbols.is_variable(symbols.get("b"))
+    assert cfg.get_productions().get_dict_productions() == {
+        "S": ["a S1 b", "!"], "S1": ["ab", "S1 S1"]}
+    assert cfg == parse_cfg_string('''S -> a S1 b | !
+S1 -> a b | S1 S1''')
+
+
+def test_tails_round_trip():
+    # V7 is a variable, V 7 two symbols and ab ! a single terminal
+    cfg = parse_cfg_string('''S -> V7 | V 7 | ab ! | a b
+V7 -> x
+V -> y''')
+    symbols = cfg.get_symbols()
+    raw = cfg.get_dict_productions_raw()[symbols.get("S")]
+    assert [symbols.names(tail) for tail in raw] == [
+        ("V7",), ("V", "7"), ("ab",), ("a", "b")]
+    assert cfg.get_productions().get_dict_productions()["S"] == ["V7", "V 7", "ab !", "ab"]
+    assert parse_cfg_string(repr(cfg)) == cfg
+
+
+def test_eq_does_not_copy():
+    cfg = parse_cfg_string("S -> aS | b")
+    other = parse_cfg_string("S -> b | aS")
+    raw = cfg.get_dict_productions_raw()
+    tails = raw[cfg.get_symbols().get("S")]
+    assert cfg == other and other == cfg
+    # Comparing didn't share the dicts, so writing still happens in place
+    cfg.add_production("S", "c")
+    other.add_production("S", "c")
+    assert cfg.get_dict_productions_raw() is raw and raw[cfg.get_symbols().get("S")] is tails
@@ -0,0 +1,36 @@
+import itertools
+
+from lib.automaton_ops import convert_to_chomsky, enumerate_language
+from lib.cyk import CYKParser
+from lib.parser import parse_cfg_string
+
+
+def test_cyk():
+    # Balanced parentheses
+    cfg = parse_cfg_string('''S -> AB | AC | SS | !
+C -> SB
+A -> (
+B -> )''')
+    parser = CYKParser(cfg)
+    for string in ["", "()", "(())()", "((()())())"]:
+        assert parser.check_string_in_language(string)
+    for string in ["(", "(()", "())(", ")(", "(a)"]:
+        assert not parser.check_string_in_language(string)
+
+
+def test_cyk_not_chomsky():
+    try:
+        CYKParser(parse_cfg_string("S -> aS | a"))
+        assert False
+    except ValueError:
+        pass
+
+
+def test_cyk_multi_character_terminals():
+    cfg = parse_cfg_string('''S -> ab c | a S b | bc a''')
+    parser = CYKParser(convert_to_chomsky(cfg))
+    expected = set(enumerate_language(cfg, 7))
+    assert "abc" in expected and "aabcb" in expected
+    for length in range(8):
+        for string in map("".join, itertools.product("abc", repeat=length)):
+            assert parser.check_string_in_language(string) == (string in expected), string
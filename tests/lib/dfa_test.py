@@ -0,0 +1,33 @@
+from lib.compiled_dfa import DEAD
+from lib.dfa import DFA
+from lib.state import State
+from lib.transition import Transition
+
+
+def even_a_dfa() -> DFA:
+    # Accepts strings over {a, b} with an even number of a's
+    states = {State(0, "q0", True, True), State(1, "q1", False, False)}
+    transitions = {
+        Transition(0, "a"): [1],
+        Transition(0, "b"): [0],
+        Transition(1, "a"): [0],
+        Transition(1, "b"): [1],
+    }
+    return DFA(states, transitions)
+
+
+def test_compile_table():
+    compiled = even_a_dfa().compile()
+    a, b = compiled.symbol_index["a"], compiled.symbol_index["b"]
+    q0, q1 = compiled.state_index[0], compiled.state_index[1]
+    assert compiled.step(q0, a) == q1 and compiled.step(q1, b) == q1
+    assert compiled.step(DEAD, a) == DEAD
+    assert compiled.encode("abc") is None
+
+
+def test_check_string_in_language():
+    dfa = even_a_dfa()
+    assert dfa.check_string_in_language("aa")
+    assert dfa.check_string_in_language("abab")
+    assert not dfa.check_string_in_language("ab")
+    assert not dfa.check_string_in_language("ac")
@@ -0,0 +1,44 @@
+from lib import instrumentation
+from lib.automaton_ops import create_distinguishability_table
+from tests.lib.dfa_test import even_a_dfa
+from tests.lib.nfa_test import ends_with_ab_nfa
+
+
+def test_disabled_by_default():
+    instrumentation.reset_stats()
+    even_a_dfa().check_string_in_language("aba")
+    assert instrumentation.stats() == instrumentation.Stats({}, {})
+
+
+def test_stats():
+    instrumentation.reset_stats()
+    nfa = ends_with_ab_nfa()
+    with instrumentation.enabled():
+        assert nfa.check_string_in_language("abab")
+        assert not nfa.check_string_in_language("abc")
+        create_distinguishability_table(even_a_dfa())
+    assert not instrumentation.ENABLED
+
+    snapshot = instrumentation.stats(reset=True)
+    assert snapshot.counters["nfa.strings"] == 2
+    assert snapshot.counters["nfa.steps"] == 4
+    assert snapshot.counters["automaton.symbols"] == 4
+    assert snapshot.counters["nfa.e_closures"] >= 1
+    assert snapshot.counters["distinguishability.rounds"] == 2
+    assert snapshot.timers["automaton.tokenize"].calls == 2
+    assert snapshot.timers["automaton_ops.create_distinguishability_table"].calls == 1
+    assert instrumentation.stats() == instrumentation.Stats({}, {})
+
+
+def test_profile():
+    dfa = even_a_dfa()
+    with instrumentation.enabled():
+        dfa.check_string_in_language("a")
+        with instrumentation.profile() as profile:
+            dfa.check_string_in_language("aabb")
+        dfa.check_string_in_language("a")
+
+    assert profile.stats.counters == {"dfa.strings": 1, "automaton.symbols": 4}
+    assert "check_string_in_language" in profile.report()
+    # The calls outside the profile are still counted globally
+    assert instrumentation.stats(reset=True).counters["dfa.strings"] == 2
@@ -0,0 +1,50 @@
+from lib.nfa import NFA
+from lib.state import State
+from lib.transition import Transition
+
+
+def ends_with_ab_nfa() -> NFA:
+    # Accepts strings over {a, b} that end with "ab", q3 is
+    # only reachable through an e transition
+    states = {State(0, "q0", True, False), State(1, "q1", False, False),
+              State(2, "q2", False, False), State(3, "q3", False, True)}
+    transitions = {
+        Transition(0, "a"): [0, 1],
+        Transition(0, "b"): [0],
+        Transition(1, "b"): [2],
+        Transition(2, ""): [3],
+    }
+    return NFA(states, transitions)
+
+
+def test_calculate_e_closure():
+    nfa = ends_with_ab_nfa()
+    assert {state.id for state in nfa.calculate_e_closure([2])} == {2, 3}
+    assert {state.id for state in nfa.calculate_e_closure([0, 1])} == {0, 1}
+
+
+def test_check_string_in_language():
+    nfa = ends_with_ab_nfa()
+    assert nfa.check_string_in_language("ab")
+    assert nfa.check_string_in_language("babab")
+    assert not nfa.check_string_in_language("aba")
+    assert not nfa.check_string_in_language("")
+    assert not nfa.check_string_in_language("abc")
+
+
+def test_closure_cache_info():
+    nfa = ends_with_ab_nfa()
+    nfa.check_string_in_language("abab")
+    nfa.check_string_in_language("abab")
+    info = nfa.closure_cache_info()
+    assert info.hits > 0 and info.currsize <= info.maxsize
+
+
+def test_lazy_dfa():
+    nfa = ends_with_ab_nfa()
+    lazy = nfa.lazy_dfa(max_states=2)
+    for string in ["", "ab", "babab", "aba", "abc", "aabbab", "bbbb"]:
+        assert lazy.check_string_in_language(
+            string) == nfa.check_string_in_language(string)
+    assert lazy.flushes > 0 and lazy.num_states <= 2
+    assert nfa.lazy_dfa(max_states=2) is lazy
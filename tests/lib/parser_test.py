@@ -0,0 +1,59 @@
+import xml.etree.ElementTree as ET
+
+from lib.parser import (JFLAPParseError, iterparse_jflap_xml, parse_jflap_dfa,
+                        parse_jflap_nfa, parse_states, parse_transitions)
+from lib.state import State
+from lib.transition import Transition
+
+JFLAP = """<?xml version="1.0" encoding="UTF-8" standalone="no"?>
+<structure>
+    <type>fa</type>
+    <automaton>
+        <state id="0" name="q0"><x>0.0</x><y>0.0</y><initial/><final/></state>
+        <state id="1" name="q1"><x>1.0</x><y>0.0</y></state>
+        <transition><from>0</from><to>1</to><read>a</read></transition>
+        <transition><from>0</from><to>0</to><read>b</read></transition>
+        <transition><from>1</from><to>0</to><read>a</read></transition>
+        <transition><from>1</from><to>1</to><read>b</read></transition>
+    </automaton>
+</structure>"""
+
+
+def test_iterparse_jflap_xml(tmp_path):
+    path = tmp_path / "even.jff"
+    path.write_text(JFLAP)
+    states, transitions = iterparse_jflap_xml(str(path))
+    assert states == {State(0, "q0", True, True), State(1, "q1", False, False)}
+    assert transitions == {Transition(0, "a"): [1], Transition(0, "b"): [0],
+                           Transition(1, "a"): [0], Transition(1, "b"): [1]}
+
+    root = ET.fromstring(JFLAP)
+    assert (states, transitions) == (
+        parse_states(root), parse_transitions(root))
+
+
+def test_iterparse_jflap_xml_malformed(tmp_path):
+    path = tmp_path / "bad.jff"
+    for contents in ["<structure><automaton>", "<structure></structure>",
+                     JFLAP.replace("<from>1</from>", "<from>x</from>"),
+                     JFLAP.replace("<to>1</to>", "")]:
+        path.write_text(contents)
+        try:
+            iterparse_jflap_xml(str(path))
+            assert False, contents
+        except JFLAPParseError:
+            pass
+
+
+def test_parse_jflap_invalid_automaton(tmp_path):
+    path = tmp_path / "bad.jff"
+    for contents in [JFLAP.replace("<initial/>", ""),
+                     JFLAP.replace("<to>1</to><read>a</read>", "<to>7</to><read>a</read>"),
+                     JFLAP.replace("<from>1</from><to>0</to>", "<from>7</from><to>0</to>")]:
+        path.write_text(contents)
+        for parse in [parse_jflap_dfa, parse_jflap_nfa]:
+            try:
+                parse(str(path))
+                assert False, contents
+            except JFLAPParseError:
+                pass
@@ -0,0 +1,49 @@
+import itertools
+import re
+
+from lib.regex import regex_to_nfa, verify_against_regex_exact
+from tests.lib.nfa_test import ends_with_ab_nfa
+
+
+def test_regex_to_nfa():
+    patterns = [r"^((?!bba).)*$", r"^.*baa.*$", r"^[^a]*(a[^a]*a[^a]*)*$",
+                r"ab|ba", r"(a|bc)+c?$", r"[a-b]{2,3}$", r"^a(?:b|c)*((?!cb).)*$",
+                r"\w\w$", r"^$", r"\D$", r"\W|a$", r"[\S]b", r"a{,2}$", r"\.|\n|a",
+                r"a|b$", r"ab|ba$", r"a$|^b", r"a+?b", r"a+?$", r"(ab)*?c$", r"a{1,2}?$"]
+    for pattern in patterns:
+        nfa = regex_to_nfa(pattern, "abc")
+        regex = re.compile(pattern)
+        for length in range(7):
+            for string in map("".join, itertools.product("abc", repeat=length)):
+                assert nfa.check_string_in_language(string) == bool(
+                    regex.match(string)), (pattern, string)
+
+
+def test_regex_to_nfa_unsupported():
+    for pattern in [r"a(?=b)", r"((?!a).)*b", r"(a", r"a{2", r"a\b", r"\Ba",
+                    r"\Aa", r"a\Z", r"(a)\1", r"\x41", r"[\q]", r"a**", r"a{2}{2}",
+                    r"a*??", r"a{3,1}", r"[c-a]", r"a$b", r"(a$)"]:
+        try:
+            regex_to_nfa(pattern, "ab")
+            assert False, pattern
+        except ValueError:
+            pass
+
+
+def test_regex_to_nfa_escapes():
+    # Control escapes are characters, not the letter after the backslash
+    symbols = "an!\n\t"
+    for pattern in [r"\n$", r"\t?a$", r"\W$", r"[\n!]a$", r"a.$", r"^((?!a!).)*$"]:
+        nfa = regex_to_nfa(pattern, symbols)
+        regex = re.compile(pattern)
+        for length in range(4):
+            for string in map("".join, itertools.product(symbols, repeat=length)):
+                assert nfa.check_string_in_language(string) == bool(
+                    regex.match(string)), (pattern, string)
+
+
+def test_verify_against_regex_exact():
+    assert verify_against_regex_exact(ends_with_ab_nfa(), re.compile(r"^[ab]*ab$"))
+    assert not verify_against_regex_exact(ends_with_ab_nfa(), re.compile(r"[ab]*ab"))
+    # Only the second option is anchored
+    assert verify_against_regex_exact(regex_to_nfa(r"a.*|b$", "ab"), re.compile(r"a|b$"))
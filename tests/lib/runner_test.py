@@ -0,0 +1,46 @@
+import itertools
+
+from lib.dfa import DFA
+from lib.state import State
+from lib.transition import Transition
+from tests.lib.nfa_test import ends_with_ab_nfa
+
+
+def multi_character_dfa() -> DFA:
+    # Accepts strings over {a, ab, b} that end with "ab" read as one symbol
+    states = {State(0, "q0", True, False), State(1, "q1", False, True)}
+    transitions = {
+        Transition(0, "a"): [0], Transition(0, "b"): [0], Transition(0, "ab"): [1],
+        Transition(1, "a"): [0], Transition(1, "b"): [0], Transition(1, "ab"): [1],
+    }
+    return DFA(states, transitions)
+
+
+def test_runner_chunks():
+    for automaton in (multi_character_dfa(), ends_with_ab_nfa()):
+        for length in range(7):
+            for string in map("".join, itertools.product("ab", repeat=length)):
+                # Split the string at every position
+                for split in range(length + 1):
+                    runner = automaton.runner()
+                    runner.feed(string[:split])
+                    runner.feed(string[split:])
+                    assert runner.accepting == automaton.check_string_in_language(
+                        string)
+
+
+def test_runner_snapshot():
+    runner = multi_character_dfa().runner()
+    runner.feed("ba")
+    snapshot = runner.snapshot()
+    assert not runner.accepting
+    runner.feed("b")
+    assert runner.accepting
+    runner.restore(snapshot)
+    runner.feed("a")
+    assert not runner.accepting
+    runner.feed("c")
+    assert not runner.accepting
+    runner.reset()
+    runner.feed("ab")
+    assert runner.accepting
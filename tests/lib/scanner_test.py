@@ -0,0 +1,18 @@
+from lib.scanner import ByteScanner
+from tests.lib.dfa_test import even_a_dfa
+
+
+def test_scan(tmp_path):
+    path = tmp_path / "lines.txt"
+    path.write_bytes(b"aa\nab\n\nbab\nac\nabba")
+    scanner = ByteScanner(even_a_dfa())
+    assert list(scanner.scan(str(path))) == [
+        (0, b"aa"), (6, b""), (14, b"abba")]
+    assert list(scanner.match_offsets(str(path))) == [0, 6, 14]
+    assert scanner.count_matches(str(path)) == 3
+
+
+def test_scan_empty_file(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    assert ByteScanner(even_a_dfa()).count_matches(str(path)) == 0
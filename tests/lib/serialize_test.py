@@ -0,0 +1,36 @@
+import os
+
+from lib.dfa import DFA
+from lib.nfa import NFA
+from lib.serialize import load, load_jflap_cached, save
+from tests.lib.dfa_test import even_a_dfa
+from tests.lib.nfa_test import ends_with_ab_nfa
+from tests.lib.parser_test import JFLAP
+
+
+
+def test_save_load(tmp_path):
+    for automaton in (even_a_dfa(), ends_with_ab_nfa()):
+        path = str(tmp_path / "automaton.bin")
+        save(automaton, path)
+        loaded = load(path)
+        assert type(loaded) is type(automaton)
+        assert dict(loaded.states) == dict(automaton.states)
+        assert dict(loaded.transitions) == dict(automaton.transitions)
+        for string in ["", "a", "ab", "aab", "abab", "bb"]:
+            assert loaded.check_string_in_language(
+                string) == automaton.check_string_in_language(string)
+
+
+def test_load_jflap_cached(tmp_path):
+    path = tmp_path / "even.jff"
+    path.write_text(JFLAP)
+    cache_dir = str(tmp_path / "cache")
+    parsed = load_jflap_cached(str(path), cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 1
+    cached = load_jflap_cached(str(path), cache_dir=cache_dir)
+    assert isinstance(parsed, DFA) and isinstance(cached, DFA)
+    assert dict(cached.transitions) == dict(even_a_dfa().transitions)
+    assert isinstance(load_jflap_cached(
+        str(path), nfa=True, cache_dir=cache_dir), NFA)
+    assert len(os.listdir(cache_dir)) == 2
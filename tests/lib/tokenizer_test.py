@@ -0,0 +1,14 @@
+from lib.tokenizer import SymbolTrie
+
+
+def test_tokenize_longest_match():
+    trie = SymbolTrie({"a", "ab", "abc", "b", ""})
+    assert trie.tokenize("aababc") == ["a", "ab", "abc"]
+    assert trie.tokenize("abab", indices=True) == [1, 1]
+    assert trie.tokenize("") == []
+
+
+def test_tokenize_unknown_symbol():
+    trie = SymbolTrie({"a", "ab"})
+    assert trie.tokenize("abx") is None
+    assert trie.tokenize("b") is None